@@ -1,37 +1,67 @@
 # c 2024-03-25
-# m 2024-09-16
+# m 2026-10-19
 
 from base64 import b64encode
 from datetime import datetime as dt
-import json
 from math import ceil
 import os
-import sqlite3 as sql
-from time import sleep
+from time import sleep, time
+from zoneinfo import ZoneInfo as tz
 
 from discord_webhook import DiscordEmbed, DiscordWebhook
-from nadeo_api import auth, core, live, oauth
-from pytz import timezone as tz
-from requests import get, put
+from nadeo_api import auth
 
 try:
-    from .util import format_race_time, log, now, strip_format_codes
+    from . import net
+    from .db import write_account_names, write_campaign_maps, write_totd_maps, write_totd_warriors, write_zones
+    from .export import export_warriors, load_warriors, mark_uploaded
+    from .jobs import Job, run_scheduler
+    from .mirror import run_mirror
+    from .queries import get_account_names, get_totd_by_date, get_totd_by_uid
+    from .util import format_race_time, get_warrior_time, log, now, strip_format_codes
 except ImportError:
-    from util import format_race_time, log, now, strip_format_codes
+    import net
+    from db import write_account_names, write_campaign_maps, write_totd_maps, write_totd_warriors, write_zones
+    from export import export_warriors, load_warriors, mark_uploaded
+    from jobs import Job, run_scheduler
+    from mirror import run_mirror
+    from queries import get_account_names, get_totd_by_date, get_totd_by_uid
+    from util import format_race_time, get_warrior_time, log, now, strip_format_codes
 
 
-db_file:   str   = f'{os.path.dirname(__file__)}/../tm.db'
 uid_file:  str   = f'{os.path.dirname(__file__)}/../latest_totd.txt'
 wait_time: float = 0.5
 
+account_names:   dict[str, str]  = {}       # account ID -> display name, filled from the database by `prewarm`
+mirror_time:     tuple[int, int] = (19, 30)  # Paris time, after the TOTD job has written the day's maps
+poll_interval:   float           = 1.0
+poll_timeout:    float           = 600.0
+prewarm_minutes: int             = 5
+totd_release:    tuple[int, int] = (19, 0)  # Paris time
+warrior_time:    tuple[int, int] = (21, 0)  # Paris time
+
 
 def get_account_name(tokens: dict, account_id: str) -> str:
+    if account_id in account_names:
+        return account_names[account_id]
+
     log(f'getting account name for {account_id}')
 
     sleep(wait_time)
-    req = oauth.account_names_from_ids(tokens['oauth'], account_id)
+    req: dict = net.nadeo_get(
+        tokens['oauth'],
+        auth.url_oauth,
+        'api/display-names',
+        {'accountId[]': account_id}
+    )
 
     account_name: str = req[account_id]
+    account_names[account_id] = account_name
+
+    try:
+        write_account_names({account_id: account_name})
+    except Exception as e:
+        log(f'ERROR (write_account_names): {type(e)} | {e}')
 
     log(f'account name: {account_name}')
 
@@ -46,7 +76,12 @@ def get_campaign_maps(tokens: dict) -> dict:
     uids:       list = []
 
     sleep(wait_time)
-    maps: dict = live.maps_campaign(tokens['live'], 99)
+    maps: dict = net.nadeo_get(
+        tokens['live'],
+        auth.url_live,
+        'api/campaign/official',
+        {'length': 99, 'offset': 0}
+    )
 
     campaignList: list[dict] = maps['campaignList']
 
@@ -67,28 +102,8 @@ def get_campaign_maps(tokens: dict) -> dict:
     for i, group in enumerate(uid_groups):
         log(f'getting campaign map info ({i + 1}/{len(uid_groups)} groups)')
 
-        sleep(wait_time)
-        map_info: dict = core.get(
-            tokens['core'],
-            'maps',
-            {'mapUidList': group}
-        )
-
-        for map in map_info:
-            uid: str = map['mapUid']
-            maps_by_uid[uid]['author']        = map['author']
-            maps_by_uid[uid]['authorTime']    = map['authorScore']
-            maps_by_uid[uid]['bronzeTime']    = map['bronzeScore']
-            maps_by_uid[uid]['downloadUrl']   = map['fileUrl']
-            maps_by_uid[uid]['goldTime']      = map['goldScore']
-            maps_by_uid[uid]['id']            = map['mapId']
-            maps_by_uid[uid]['name']          = str(map['name']).strip()
-            maps_by_uid[uid]['silverTime']    = map['silverScore']
-            maps_by_uid[uid]['submitter']     = map['submitter']
-            maps_by_uid[uid]['thumbnailUrl']  = map['thumbnailUrl']
-            maps_by_uid[uid]['timestampIso']  = map['timestamp']
-            maps_by_uid[uid]['timestampUnix'] = int(dt.fromisoformat(map['timestamp']).timestamp())
-            maps_by_uid[uid]['uid']           = uid
+        for map in get_map_info(tokens, group):
+            maps_by_uid[map['mapUid']].update(parse_map_info(map))
 
     j: int = 0
 
@@ -107,7 +122,12 @@ def get_current_totd_warrior(tokens: dict) -> dict:
     log('getting totd warrior time')
 
     sleep(wait_time)
-    maps: dict = live.maps_totd(tokens['live'], 1)
+    maps: dict = net.nadeo_get(
+        tokens['live'],
+        auth.url_live,
+        'api/token/campaign/month',
+        {'length': 1, 'offset': 0}
+    )
 
     days: list[dict] = maps['monthList'][0]['days']
 
@@ -120,10 +140,7 @@ def get_current_totd_warrior(tokens: dict) -> dict:
 
     log('reading db for totd info')
 
-    with sql.connect(db_file) as con:
-        con.row_factory = sql.Row
-        cur: sql.Cursor = con.cursor()
-        map: dict = dict(cur.execute(f'SELECT * FROM TotdMaps WHERE uid = "{map_uid}"').fetchone())
+    map: dict = get_totd_by_uid(map_uid)
 
     author: str = map['author']
     author_time: int = map['authorTime']
@@ -133,8 +150,9 @@ def get_current_totd_warrior(tokens: dict) -> dict:
     log('getting totd records')
 
     sleep(wait_time)
-    records: dict = live.get(
+    records: dict = net.nadeo_get(
         tokens['live'],
+        auth.url_live,
         f'api/token/leaderboard/group/Personal_Best/map/{map_uid}/top'
     )
 
@@ -152,7 +170,30 @@ def get_current_totd_warrior(tokens: dict) -> dict:
     }
 
 
+def get_map_info(tokens: dict, uids: str) -> list:
+    '''
+    - `uids` is a comma-separated list of up to 270 map UIDs
+    '''
+
+    sleep(wait_time)
+    return net.nadeo_get(
+        tokens['core'],
+        auth.url_core,
+        'maps',
+        {'mapUidList': uids}
+    )
+
+
 def get_tokens() -> dict:
+    if net.replaying():
+        log('replaying cassette, using placeholder tokens')
+
+        return {
+            'core':  net.get_placeholder_token(auth.audience_core),
+            'live':  net.get_placeholder_token(auth.audience_live),
+            'oauth': net.get_placeholder_token(auth.audience_oauth)
+        }
+
     log('getting core token')
     token_core: auth.Token = auth.get_token(
         auth.audience_core,
@@ -193,7 +234,12 @@ def get_totd_maps(tokens: dict) -> dict:
     uids:       list = []
 
     sleep(wait_time)
-    maps: dict = live.maps_totd(tokens['live'], 99)
+    maps: dict = net.nadeo_get(
+        tokens['live'],
+        auth.url_live,
+        'api/token/campaign/month',
+        {'length': 99, 'offset': 0}
+    )
 
     maps_by_uid: dict = {}
 
@@ -222,29 +268,8 @@ def get_totd_maps(tokens: dict) -> dict:
     for i, group in enumerate(uid_groups):
         log(f'getting TOTD map info ({i + 1}/{len(uid_groups)} groups)')
 
-        sleep(wait_time)
-        map_info: dict = core.get(
-            tokens['core'],
-            'maps',
-            {'mapUidList': group}
-        )
-
-        for map in map_info:
-            uid: str = map['mapUid']
-            maps_by_uid[uid]['author']        = map['author']
-            maps_by_uid[uid]['authorTime']    = map['authorScore']
-            maps_by_uid[uid]['bronzeTime']    = map['bronzeScore']
-            maps_by_uid[uid]['downloadUrl']   = map['fileUrl']
-            maps_by_uid[uid]['goldTime']      = map['goldScore']
-            maps_by_uid[uid]['id']            = map['mapId']
-            maps_by_uid[uid]['nameClean']     = strip_format_codes(str(map['name']).strip())
-            maps_by_uid[uid]['nameRaw']       = str(map['name']).strip()
-            maps_by_uid[uid]['silverTime']    = map['silverScore']
-            maps_by_uid[uid]['submitter']     = map['submitter']
-            maps_by_uid[uid]['thumbnailUrl']  = map['thumbnailUrl']
-            maps_by_uid[uid]['timestampIso']  = map['timestamp']
-            maps_by_uid[uid]['timestampUnix'] = int(dt.fromisoformat(map['timestamp']).timestamp())
-            maps_by_uid[uid]['uid']           = uid
+        for map in get_map_info(tokens, group):
+            maps_by_uid[map['mapUid']].update(parse_totd_map_info(map))
 
     j: int = 0
 
@@ -258,31 +283,13 @@ def get_totd_maps(tokens: dict) -> dict:
     return maps_by_uid
 
 
-def get_warrior_time(author_time: int, world_record: int, factor: float | None = 0.25) -> int:
-    '''
-    - `factor` is offset from AT
-        - between `0.0` and `1.0`
-        - examples, given AT is `10.000` and WR is `8.000`:
-            - `0.000` - AT (`10.000`)
-            - `0.125` - 1/8 of the way between AT and WR (`9.750`) (default for TOTDs)
-            - `0.250` - 1/4 of the way between AT and WR (`9.500`) (default, default for campaigns)
-            - `0.750` - 3/4 of the way between AT and WR (`8.500`)
-            - `1.000` - WR (`8.000`)
-    '''
-
-    return author_time - max(
-        int((author_time - world_record) * (factor if factor is not None else 0.25)),
-        1
-    )
-
-
 def get_zones(tokens: dict) -> dict:
     log('getting zones')
 
     zones: dict = {}
 
     sleep(wait_time)
-    req = core.zones(tokens['core'])
+    req: list = net.nadeo_get(tokens['core'], auth.url_core, 'zones')
 
     for key in req:
         zones[key['zoneId']] = {
@@ -312,6 +319,10 @@ def get_zones(tokens: dict) -> dict:
 
 
 def map_is_new(uid: str) -> bool:
+    '''
+    - whether `uid` differs from the last notified TOTD - only `save_notified_uid` changes that
+    '''
+
     if os.path.isfile(uid_file):
         with open(uid_file, 'r') as f:
             last_uid: str = f.read().strip('\n')
@@ -319,314 +330,134 @@ def map_is_new(uid: str) -> bool:
         if uid == last_uid:
             return False
 
-    else:
-        with open(uid_file, 'w', newline='\n') as f:
-            f.write(f'{uid}\n')
-
     return True
 
 
-def write_campaign_maps(campaign_maps: dict) -> None:
-    log('writing campaign maps to database')
-
-    with sql.connect(db_file) as con:
-        cur: sql.Cursor = con.cursor()
-
-        cur.execute('BEGIN')
-        cur.execute('DROP TABLE IF EXISTS CampaignMaps')
-        cur.execute(f'''
-            CREATE TABLE IF NOT EXISTS CampaignMaps (
-                author        CHAR(36),
-                authorTime    INT,
-                bronzeTime    INT,
-                campaign      INT,
-                downloadUrl   CHAR(86),
-                goldTime      INT,
-                id            CHAR(36),
-                mapIndex      INT,
-                name          VARCHAR(16),
-                silverTime    INT,
-                submitter     CHAR(36),
-                thumbnailUrl  CHAR(90),
-                timestampIso  CHAR(25),
-                timestampUnix INT,
-                uid           VARCHAR(27) PRIMARY KEY
-            );
-        ''')
-
-        for uid in campaign_maps:
-            cur.execute(f'''
-                INSERT INTO CampaignMaps (
-                    author,
-                    authorTime,
-                    bronzeTime,
-                    campaign,
-                    downloadUrl,
-                    goldTime,
-                    id,
-                    mapIndex,
-                    name,
-                    silverTime,
-                    submitter,
-                    thumbnailUrl,
-                    timestampIso,
-                    timestampUnix,
-                    uid
-                ) VALUES (
-                    "{campaign_maps[uid]['author']}",
-                    "{campaign_maps[uid]['authorTime']}",
-                    "{campaign_maps[uid]['bronzeTime']}",
-                    "{campaign_maps[uid]['campaign']}",
-                    "{campaign_maps[uid]['downloadUrl']}",
-                    "{campaign_maps[uid]['goldTime']}",
-                    "{campaign_maps[uid]['id']}",
-                    "{campaign_maps[uid]['index']}",
-                    "{campaign_maps[uid]['name']}",
-                    "{campaign_maps[uid]['silverTime']}",
-                    "{campaign_maps[uid]['submitter']}",
-                    "{campaign_maps[uid]['thumbnailUrl']}",
-                    "{campaign_maps[uid]['timestampIso']}",
-                    "{campaign_maps[uid]['timestampUnix']}",
-                    "{campaign_maps[uid]['uid']}"
-                )
-            ''')
-
-    log('wrote campaign maps to database')
-
-
-def write_campaign_warriors(warriors: dict) -> None:
-    log('writing campaign warriors to database')
-
-    with sql.connect(db_file) as con:
-        cur: sql.Cursor = con.cursor()
-
-        cur.execute('BEGIN')
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS CampaignWarriors (
-                authorTime  INT,
-                custom      INT,
-                name        TEXT,
-                reason      TEXT,
-                uid         VARCHAR(27) PRIMARY KEY,
-                warriorTime INT,
-                worldRecord INT
-            )
-        ''')
-
-        for uid, map in warriors.items():
-            cur.execute(f'''
-                INSERT INTO CampaignWarriors (
-                    authorTime,
-                    name,
-                    uid,
-                    warriorTime,
-                    worldRecord
-                ) VALUES (
-                    "{map['author_time']}",
-                    "{map['map_name']}",
-                    "{uid}",
-                    "{map['warrior_time']}",
-                    "{map['world_record']}"
-                )
-            ''')
-
-    log('wrote campaign warriors to database')
-
-
-def write_other_warriors(warriors: dict) -> None:
-    log('writing other warriors to database')
-
-    with sql.connect(db_file) as con:
-        cur: sql.Cursor = con.cursor()
-
-        cur.execute('BEGIN')
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS OtherWarriors (
-                authorTime    INT,
-                campaign      TEXT,
-                campaignIndex INT,
-                custom        INT,
-                name          TEXT,
-                reason        TEXT,
-                uid           VARCHAR(27) PRIMARY KEY,
-                warriorTime   INT,
-                worldRecord   INT
-            )
-        ''')
-
-        for uid, map in warriors.items():
-            cur.execute(f'''
-                INSERT INTO OtherWarriors (
-                    authorTime,
-                    campaign,
-                    campaignIndex,
-                    name,
-                    uid,
-                    warriorTime,
-                    worldRecord
-                ) VALUES (
-                    "{map['authorTime']}",
-                    "{map['campaign']}",
-                    "{map['index']}",
-                    "{map['name']}",
-                    "{uid}",
-                    "{map['warriorTime']}",
-                    "{map['worldRecord']}"
-                )
-            ''')
-
-    log('wrote other warriors to database')
-
-
-def write_totd_maps(totd_maps: dict) -> None:
-    log('writing TOTD maps to database')
-
-    with sql.connect(db_file) as con:
-        cur: sql.Cursor = con.cursor()
-
-        cur.execute('BEGIN')
-        cur.execute('DROP TABLE IF EXISTS TotdMaps')
-        cur.execute(f'''
-            CREATE TABLE IF NOT EXISTS TotdMaps (
-                author        CHAR(36),
-                authorTime    INT,
-                bronzeTime    INT,
-                date          CHAR(10),
-                downloadUrl   CHAR(86),
-                goldTime      INT,
-                id            CHAR(36),
-                mapIndex      INT,
-                nameClean     TEXT,
-                nameRaw       TEXT,
-                season        CHAR(36),
-                silverTime    INT,
-                submitter     CHAR(36),
-                thumbnailUrl  CHAR(90),
-                timestampIso  CHAR(25),
-                timestampUnix INT,
-                uid           VARCHAR(27) PRIMARY KEY
-            );
-        ''')
-
-        for uid in totd_maps:
-            cur.execute(f'''
-                INSERT INTO TotdMaps (
-                    author,
-                    authorTime,
-                    bronzeTime,
-                    date,
-                    downloadUrl,
-                    goldTime,
-                    id,
-                    mapIndex,
-                    nameClean,
-                    nameRaw,
-                    season,
-                    silverTime,
-                    submitter,
-                    thumbnailUrl,
-                    timestampIso,
-                    timestampUnix,
-                    uid
-                ) VALUES (
-                    "{totd_maps[uid]['author']}",
-                    "{totd_maps[uid]['authorTime']}",
-                    "{totd_maps[uid]['bronzeTime']}",
-                    "{totd_maps[uid]['date']}",
-                    "{totd_maps[uid]['downloadUrl']}",
-                    "{totd_maps[uid]['goldTime']}",
-                    "{totd_maps[uid]['id']}",
-                    "{totd_maps[uid]['index']}",
-                    "{totd_maps[uid]['nameClean']}",
-                    "{totd_maps[uid]['nameRaw']}",
-                    "{totd_maps[uid]['season']}",
-                    "{totd_maps[uid]['silverTime']}",
-                    "{totd_maps[uid]['submitter']}",
-                    "{totd_maps[uid]['thumbnailUrl']}",
-                    "{totd_maps[uid]['timestampIso']}",
-                    "{totd_maps[uid]['timestampUnix']}",
-                    "{totd_maps[uid]['uid']}"
-                )
-            ''')
-
-    log('wrote TOTD maps to database')
-
-
-def write_totd_warriors(warriors: dict) -> None:
-    log('writing totd warriors to database')
-
-    with sql.connect(db_file) as con:
-        cur: sql.Cursor = con.cursor()
-
-        cur.execute('BEGIN')
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS TotdWarriors (
-                authorTime  INT,
-                custom      INT,
-                date        CHAR(10),
-                name        TEXT,
-                reason      TEXT,
-                uid         VARCHAR(27) PRIMARY KEY,
-                warriorTime INT,
-                worldRecord INT
-            )
-        ''')
-
-        for uid, map in warriors.items():
-            cur.execute(f'''
-                INSERT INTO TotdWarriors (
-                    authorTime,
-                    date,
-                    name,
-                    uid,
-                    warriorTime,
-                    worldRecord
-                ) VALUES (
-                    "{map['author_time']}",
-                    "{map['map_date']}",
-                    "{strip_format_codes(map['map_name'])}",
-                    "{uid}",
-                    "{map['warrior_time']}",
-                    "{map['world_record']}"
-                )
-            ''')
-
-    log('wrote totd warriors to database')
-
-
-def write_zones(zones: dict) -> None:
-    log('writing zones to database')
-
-    with sql.connect(db_file) as con:
-        cur: sql.Cursor = con.cursor()
-
-        cur.execute('BEGIN')
-        cur.execute('DROP TABLE IF EXISTS Zones')
-        cur.execute(f'''
-            CREATE TABLE IF NOT EXISTS Zones (
-                id       CHAR(36) PRIMARY KEY,
-                name     TEXT,
-                nameFull TEXT,
-                parent   CHAR(36)
-            );
-        ''')
-
-        for id in zones:
-            cur.execute(f'''
-                INSERT INTO ZONES (
-                    id,
-                    name,
-                    nameFull,
-                    parent
-                ) VALUES (
-                    "{id}",
-                    "{zones[id]['name']}",
-                    "{zones[id]['nameFull']}",
-                    "{zones[id]['parent']}"
-                )
-            ''')
-
-    log('wrote zones to database')
+def notify_if_new(tokens: dict, latest_totd: dict) -> None:
+    if not map_is_new(latest_totd['uid']):
+        log(f'ERROR: latest map is old ({latest_totd['date']} - {latest_totd['nameClean']})')
+        return
+
+    webhook = DiscordWebhook(
+        os.environ['TM_TOTD_NOTIF_DISCORD_WEBHOOK_URL'],
+        content='<@&1205378175601745970>'
+    )
+
+    embed = DiscordEmbed(
+        f'Track of the Day for {latest_totd['date']}',
+        color='00a719'
+    )
+
+    embed.add_embed_field(
+        'Map',
+        f'[{latest_totd['nameClean']}](https://trackmania.io/#/totd/leaderboard/{latest_totd['season']}/{latest_totd['uid']}) by [{get_account_name(tokens, latest_totd['author'])}](https://trackmania.io/#/player/{latest_totd['author']})',
+        False
+    )
+    embed.add_embed_field('Author Medal', format_race_time(latest_totd['authorTime']), False)
+    embed.set_thumbnail(latest_totd['thumbnailUrl'])
+    webhook.add_embed(embed)
+    net.execute_webhook(webhook)
+
+    # only once it's sent, so a failed notification is retried on the next attempt
+    save_notified_uid(latest_totd['uid'])
+
+    log(f'sent TOTD notification for {latest_totd['date']}')
+
+
+def parse_map_info(map: dict) -> dict:
+    return {
+        'author':        map['author'],
+        'authorTime':    map['authorScore'],
+        'bronzeTime':    map['bronzeScore'],
+        'downloadUrl':   map['fileUrl'],
+        'goldTime':      map['goldScore'],
+        'id':            map['mapId'],
+        'name':          str(map['name']).strip(),
+        'silverTime':    map['silverScore'],
+        'submitter':     map['submitter'],
+        'thumbnailUrl':  map['thumbnailUrl'],
+        'timestampIso':  map['timestamp'],
+        'timestampUnix': int(dt.fromisoformat(map['timestamp']).timestamp()),
+        'uid':           map['mapUid']
+    }
+
+
+def parse_totd_map_info(map: dict) -> dict:
+    info: dict = parse_map_info(map)
+
+    info['nameRaw']   = info.pop('name')
+    info['nameClean'] = strip_format_codes(info['nameRaw'])
+
+    return info
+
+
+def poll_new_totd(tokens: dict, date: str) -> dict | None:
+    '''
+    - polls only the current month until the latest released TOTD is the one for `date` (`YYYY-MM-DD`)
+        - going by date rather than known UIDs, so a database which is behind never passes off an old map as new
+    - then fetches just that map's info, so the notification costs one or two API calls once it's out
+    - returns `None` if nothing new shows up within `poll_timeout` seconds
+    '''
+
+    log('polling for new TOTD')
+
+    start: float = time()
+
+    while time() - start < poll_timeout:
+        sleep(wait_time)
+        month: dict = net.nadeo_get(
+            tokens['live'],
+            auth.url_live,
+            'api/token/campaign/month',
+            {'length': 1, 'offset': 0}
+        )['monthList'][0]
+
+        for day in reversed(month['days']):
+            if (uid := day['mapUid']) == '':
+                continue
+
+            if f'{month['year']}-{str(month['month']).zfill(2)}-{str(day['monthDay']).zfill(2)}' != date:
+                break
+
+            log(f'found new TOTD {uid} after {round(time() - start, 1)} seconds')
+
+            latest_totd: dict = {
+                'date': date,
+                'season': day['seasonUid']
+            }
+            latest_totd.update(parse_totd_map_info(get_map_info(tokens, uid)[0]))
+
+            return latest_totd
+
+        sleep(poll_interval)
+
+    log(f'ERROR: no new TOTD found after polling for {poll_timeout} seconds')
+
+    return None
+
+
+def prewarm() -> dict:
+    '''
+    - gets everything a job needs ahead of time: tokens, today's Paris date and whether its TOTD is already stored, cached account names, and open connections
+    '''
+
+    log('pre-warming')
+
+    tokens: dict = get_tokens()
+    today:  str  = dt.now(tz('Europe/Paris')).strftime('%Y-%m-%d')
+
+    account_names.update(get_account_names())
+    today_known: bool = get_totd_by_date(today) is not None
+
+    net.warm((auth.url_core, auth.url_live, auth.url_oauth, 'https://discord.com'))
+
+    log(f'pre-warmed (today\'s TOTD {'already' if today_known else 'not yet'} stored, {len(account_names)} account names)')
+
+    return {
+        'today':       today,
+        'today_known': today_known,
+        'tokens':      tokens
+    }
 
 
 def run() -> None:
@@ -634,31 +465,39 @@ def run() -> None:
 
     totd_maps: dict = get_totd_maps(tokens)
 
-    latest_totd: dict = totd_maps[list(totd_maps)[-1]]
-
-    if (map_is_new(latest_totd['uid'])):
-        webhook = DiscordWebhook(
-            os.environ['TM_TOTD_NOTIF_DISCORD_WEBHOOK_URL'],
-            content='<@&1205378175601745970>'
-        )
-
-        embed = DiscordEmbed(
-            f'Track of the Day for {latest_totd['date']}',
-            color='00a719'
-        )
-
-        embed.add_embed_field(
-            'Map',
-            f'[{latest_totd['nameClean']}](https://trackmania.io/#/totd/leaderboard/{latest_totd['season']}/{latest_totd['uid']}) by [{get_account_name(tokens, latest_totd['author'])}](https://trackmania.io/#/player/{latest_totd['author']})',
-            False
-        )
-        embed.add_embed_field('Author Medal', format_race_time(latest_totd['authorTime']), False)
-        embed.set_thumbnail(latest_totd['thumbnailUrl'])
-        webhook.add_embed(embed)
-        webhook.execute()
+    notify_if_new(tokens, totd_maps[list(totd_maps)[-1]])
+
+    write_totd_maps(totd_maps)
+
+    write_campaign_maps(get_campaign_maps(tokens))
+    write_zones(get_zones(tokens))
+
 
+def run_release() -> None:
+    '''
+    - scheduled `prewarm_minutes` before the TOTD release, then notifies as soon as the new map is out
+    - the full refresh of maps, campaign and zones happens after the notification
+    '''
+
+    warm: dict = prewarm()
+    tokens: dict = warm['tokens']
+
+    wait_until_paris(*totd_release)
+
+    latest_totd: dict | None = None
+
+    if warm['today_known']:  # a retry after the maps were written - the fallback below notifies if that still failed
+        log('today\'s TOTD is already stored, not polling')
     else:
-        log(f'ERROR: latest map is old ({latest_totd['date']} - {latest_totd['nameClean']})')
+        latest_totd = poll_new_totd(tokens, warm['today'])
+
+    if latest_totd is not None:
+        notify_if_new(tokens, latest_totd)
+
+    totd_maps: dict = get_totd_maps(tokens)
+
+    if latest_totd is None:
+        notify_if_new(tokens, totd_maps[list(totd_maps)[-1]])
 
     write_totd_maps(totd_maps)
 
@@ -666,8 +505,9 @@ def run() -> None:
     write_zones(get_zones(tokens))
 
 
-def run_totd_warrior() -> None:
-    tokens: dict[auth.Token] = get_tokens()
+def run_totd_warrior(tokens: dict | None = None) -> None:
+    if tokens is None:
+        tokens = get_tokens()
 
     totd_maps: dict = get_totd_maps(tokens)
     write_totd_maps(totd_maps)
@@ -705,24 +545,32 @@ def run_totd_warrior() -> None:
     embed.add_embed_field('Warrior Medal', format_race_time(map['warrior_time']), False)
     embed.add_embed_field('Author Medal',  format_race_time(map['author_time']),  False)
     webhook.add_embed(embed)
-    webhook.execute()
+    net.execute_webhook(webhook)
 
     log('sent totd warrior webhook')
 
 
-def send_warriors_to_github() -> None:
-    warriors: dict = {}
+def run_warrior_prewarmed() -> None:
+    warm: dict = prewarm()
 
-    with sql.connect(db_file) as con:
-        con.row_factory = sql.Row
-        cur: sql.Cursor = con.cursor()
+    wait_until_paris(*warrior_time)
 
-        cur.execute('BEGIN')
-        for table in ('Campaign', 'Totd', 'Other'):
-            for record in cur.execute(f'SELECT * FROM {table}Warriors').fetchall():
-                warriors[record['uid']] = dict(record)
+    run_totd_warrior(warm['tokens'])
 
-    url: str = 'https://api.github.com/repos/ezio416/warrior-medal-times/contents/warriors.json'
+
+def save_notified_uid(uid: str) -> None:
+    with open(uid_file, 'w', newline='\n') as f:
+        f.write(f'{uid}\n')
+
+
+def send_warriors_to_github() -> None:
+    files: dict[str, bytes] = export_warriors(load_warriors())
+
+    if not files:
+        log('no warrior changes to send to github')
+        return
+
+    url: str = 'https://api.github.com/repos/ezio416/warrior-medal-times/contents'
 
     headers: dict = {
         'Accept': 'application/vnd.github+json',
@@ -730,73 +578,54 @@ def send_warriors_to_github() -> None:
         'X_GitHub-Api-Version': '2022-11-28'
     }
 
-    log('getting file info from github')
+    message: str = now(False)
 
-    sha: str = get(url, headers=headers).json()['sha']
+    # manifest last so it never points at shards which aren't uploaded yet
+    for name in sorted(files, key=lambda name: name == 'index.json'):
+        log(f'getting file info from github ({name})')
 
-    log('sending new file to github')
-
-    put(
-        url,
-        headers=headers,
-        json={
-            'content': b64encode(json.dumps(warriors, indent=4).encode()).decode(),
-            'message': now(False),
-            'sha': sha
+        req = net.get(f'{url}/{name}', headers=headers)
+        body: dict = {
+            'content': b64encode(files[name]).decode(),
+            'message': message
         }
-    )
+
+        if req.status_code == 200:
+            body['sha'] = req.json()['sha']
+        elif req.status_code != 404:
+            raise ConnectionError(f'Bad response from GitHub: code {req.status_code}, response {req.text}')
+
+        log(f'sending new file to github ({name})')
+
+        req = net.put(f'{url}/{name}', headers=headers, json=body)
+
+        if req.status_code not in (200, 201):
+            raise ConnectionError(f'Bad response from GitHub: code {req.status_code}, response {req.text}')
+
+    # only now, so anything which failed is sent again (with the delta still covering it) next time
+    mark_uploaded()
 
     log('sent to github')
 
 
-def main() -> None:
-    attempts:              int = 10
-    wait_between_attempts: int = 10
+def wait_until_paris(hour: int, minute: int) -> None:
+    target: dt = dt.now(tz('Europe/Paris')).replace(hour=hour, minute=minute, second=0, microsecond=0)
 
-    while True:
-        now_paris = dt.now(tz('Europe/Paris'))
-
-        if now_paris.hour == 19 and now_paris.minute == 0:
-            for i in range(attempts):
-                try:
-                    run()
-                    break
-                except Exception as e:
-                    log(f'ERROR (run): {type(e)} | {e} | attempt {i + 1}/{attempts} failed, waiting {wait_between_attempts} seconds')
-                    sleep(wait_between_attempts)
-
-                if i == attempts - 1:
-                    log('ERROR (run): max attempts reached')
-
-                    DiscordWebhook(
-                        os.environ['TM_TOTD_NOTIF_DISCORD_WEBHOOK_URL'],
-                        content='<@174350279158792192> ERROR: CHECK SERVER LOGS'
-                    ).execute()
-
-            # print('waiting 60 seconds')
-            sleep(60)
-        elif now_paris.hour == 21 and now_paris.minute == 0:
-            for i in range(attempts):
-                try:
-                    run_totd_warrior()
-                    break
-                except Exception as e:
-                    log(f'ERROR (run_totd_warrior): {type(e)} | {e} | attempt {i + 1}/{attempts} failed, waiting {wait_between_attempts} seconds')
-                    sleep(wait_between_attempts)
-
-                if i == attempts - 1:
-                    log('ERROR (run_totd_warrior): max attempts reached')
-
-                    DiscordWebhook(
-                        os.environ['TM_WARRIOR_DISCORD_WEBHOOK_URL'],
-                        content='<@174350279158792192> ERROR: CHECK SERVER LOGS'
-                    ).execute()
-
-            # print('waiting 60 seconds')
-            sleep(60)
-        else:
-            # print(f'{now()} waiting')
-            sleep(1)
+    if (remaining := (target - dt.now(tz('Europe/Paris'))).total_seconds()) > 0:
+        log(f'waiting {round(remaining, 1)} seconds until {str(hour).zfill(2)}:{str(minute).zfill(2)} Paris')
+        sleep(remaining)
+
+
+def main() -> None:
+    def before(at: tuple[int, int]) -> tuple[int, int]:
+        minutes: int = at[0] * 60 + at[1] - prewarm_minutes
+        return minutes // 60, minutes % 60
+
+    run_scheduler([
+        Job('totd',    run_release,           *before(totd_release), deadline=1800.0, alert_webhook_env='TM_TOTD_NOTIF_DISCORD_WEBHOOK_URL'),
+        Job('mirror',  run_mirror,            *mirror_time,          deadline=3600.0, attempts=1),
+        Job('warrior', run_warrior_prewarmed, *before(warrior_time), deadline=1200.0, alert_webhook_env='TM_WARRIOR_DISCORD_WEBHOOK_URL')
+    ])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,243 @@
+# c 2026-10-19
+# m 2026-10-19
+
+# heavy dependencies (discord_webhook, nadeo_api, requests) are only imported by the subcommands which need them
+
+from argparse import ArgumentParser, Namespace
+import os
+import sys
+
+
+state_dir: str = ''  # set by `--state-dir`, replaces the repo root for every file the commands write
+
+
+def _import_app():
+    import app
+    import net
+
+    if state_dir:
+        app.uid_file = f'{state_dir}/latest_totd.txt'
+        _import_mirror()  # imported by app too
+
+    if net.replaying():
+        app.wait_time = 0.0  # no rate limit to respect, run as fast as possible
+
+    return app
+
+
+def _import_mirror():
+    import mirror
+
+    if state_dir:
+        mirror.mirror_dir = f'{state_dir}/mirror'
+
+    return mirror
+
+
+def _use_state_dir(path: str) -> None:
+    global state_dir
+
+    import db
+    import export
+    import jobs
+    import util
+
+    os.makedirs(path, exist_ok=True)
+    state_dir = path
+
+    db.db_file        = f'{path}/tm.db'
+    export.export_dir = f'{path}/export'
+    jobs.status_file  = f'{path}/jobs.json'
+    util.log_file     = f'{path}/tm.log'
+
+
+def cmd_campaign(args: Namespace) -> None:
+    import db
+
+    app = _import_app()
+
+    db.write_campaign_maps(app.get_campaign_maps(app.get_tokens()))
+
+
+def cmd_cancel(args: Namespace) -> None:
+    import jobs
+
+    if not jobs.cancel(args.job):
+        print(f'job {args.job} is not running')
+
+
+def cmd_daemon(args: Namespace) -> None:
+    app = _import_app()
+
+    app.main()
+
+
+def cmd_export(args: Namespace) -> None:
+    if args.upload:
+        app = _import_app()
+
+        app.send_warriors_to_github()
+        return
+
+    import export
+
+    export.export_warriors(export.load_warriors())
+
+
+def cmd_migrate(args: Namespace) -> None:
+    import maintenance
+
+    maintenance.migrate()
+
+
+def cmd_mirror(args: Namespace) -> None:
+    mirror = _import_mirror()
+
+    if args.url:
+        print(mirror.local_path(args.url))
+        return
+
+    mirror.run_mirror()
+
+
+def cmd_recalc(args: Namespace) -> None:
+    import maintenance
+
+    maintenance.recalculate_totd_warriors()
+
+
+def cmd_search(args: Namespace) -> None:
+    import search
+
+    for uid in search.search_maps(' '.join(args.text), args.limit):
+        print(uid)
+
+
+def cmd_stats(args: Namespace) -> None:
+    import json
+
+    import queries
+
+    if args.rebuild:
+        import db
+        import stats
+
+        with db.connect() as con:
+            cur = con.cursor()
+            cur.execute('BEGIN')
+            stats.refresh(cur, args.period_type)
+
+    print(json.dumps(queries.get_stats(args.period_type, args.period), indent=4))
+
+
+def cmd_status(args: Namespace) -> None:
+    import json
+
+    import jobs
+
+    print(json.dumps(jobs.get_status(), indent=4))
+
+
+def cmd_totd(args: Namespace) -> None:
+    app = _import_app()
+
+    app.run()
+
+
+def cmd_warrior(args: Namespace) -> None:
+    app = _import_app()
+
+    app.run_totd_warrior()
+
+
+def cmd_zones(args: Namespace) -> None:
+    import db
+
+    app = _import_app()
+
+    db.write_zones(app.get_zones(app.get_tokens()))
+
+
+def get_parser() -> ArgumentParser:
+    parser: ArgumentParser = ArgumentParser(description='Trackmania data jobs for e416.dev')
+
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='PATH', help='save every API/webhook/GitHub response to a cassette file')
+    cassette.add_argument('--replay', metavar='PATH', help='serve responses from a cassette file instead of the network')
+    parser.add_argument(
+        '--state-dir',
+        metavar='DIR',
+        help='keep the database, latest_totd.txt, exports, mirror, jobs.json and log in DIR instead of the repo root'
+    )
+    parser.add_argument(
+        '--latency',
+        type=float,
+        metavar='SECONDS',
+        help='when replaying, delay each response by this many seconds (negative: use the recorded time)'
+    )
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('campaign', help='fetch campaign maps and write them to the database').set_defaults(func=cmd_campaign)
+    cancel = subparsers.add_parser('cancel', help='stop a running scheduled job (from any process)')
+    cancel.add_argument('job', help='job name, as shown by status')
+    cancel.set_defaults(func=cmd_cancel)
+
+    subparsers.add_parser('daemon',   help='run the scheduling loop forever').set_defaults(func=cmd_daemon)
+
+    export = subparsers.add_parser('export', help='write warrior export files from the database')
+    export.add_argument('--upload', action='store_true', help='also send changed files to GitHub')
+    export.set_defaults(func=cmd_export)
+
+    subparsers.add_parser('migrate', help='apply pending database migrations').set_defaults(func=cmd_migrate)
+    mirror = subparsers.add_parser('mirror', help='download thumbnails and map files which aren\'t mirrored yet')
+    mirror.add_argument('--url', help='only print the local path of this URL\'s mirrored copy')
+    mirror.set_defaults(func=cmd_mirror)
+
+    subparsers.add_parser('recalc',  help='recalculate TOTD warrior times in the database').set_defaults(func=cmd_recalc)
+    search = subparsers.add_parser('search', help='find maps by name or author, best match first')
+    search.add_argument('text', nargs='+')
+    search.add_argument('--limit', type=int, default=20)
+    search.set_defaults(func=cmd_search)
+
+    stats = subparsers.add_parser('stats', help='show medal time and warrior gap summaries per period')
+    stats.add_argument('period_type', choices=('campaign', 'month', 'season', 'warriorCampaign', 'warriorMonth', 'warriorOther'))
+    stats.add_argument('period', nargs='?', help='i.e. 2026-10 for a month, all periods if left out')
+    stats.add_argument('--rebuild', action='store_true', help='recompute every period first')
+    stats.set_defaults(func=cmd_stats)
+
+    subparsers.add_parser('status',  help='show the state of each scheduled job').set_defaults(func=cmd_status)
+    subparsers.add_parser('totd',    help='run the daily TOTD job (notification, maps, campaign, zones)').set_defaults(func=cmd_totd)
+    subparsers.add_parser('warrior', help='run the daily TOTD warrior job').set_defaults(func=cmd_warrior)
+    subparsers.add_parser('zones',   help='fetch zones and write them to the database').set_defaults(func=cmd_zones)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser: ArgumentParser = get_parser()
+    args:   Namespace      = parser.parse_args(argv)
+
+    if args.command == 'daemon' and (args.record or args.replay):
+        parser.error('--record/--replay don\'t reach the daemon\'s jobs, which run in their own processes')
+
+    if args.replay and not args.state_dir:
+        parser.error('--replay needs --state-dir, so a replay never overwrites the live database or latest_totd.txt')
+
+    if args.state_dir:
+        if args.command == 'daemon':
+            parser.error('--state-dir doesn\'t reach the daemon\'s jobs, which run in their own processes')
+
+        _use_state_dir(args.state_dir)
+
+    if args.record or args.replay:
+        import net
+
+        net.set_cassette(args.record or args.replay, 'record' if args.record else 'replay', args.latency)
+
+    args.func(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,517 @@
+# c 2026-10-19
+# m 2026-10-19
+
+from hashlib import sha256
+import json
+import os
+import sqlite3 as sql
+from time import time
+from typing import Callable
+
+try:
+    from . import stats
+    from .util import log, strip_format_codes
+except ImportError:
+    import stats
+    from util import log, strip_format_codes
+
+
+db_file: str = f'{os.path.dirname(__file__)}/../tm.db'
+
+# secondary indexes for the lookups in queries.py and stats.py - rebuilt tables get these recreated on swap
+indexes: dict[str, tuple[str, ...]] = {
+    'CampaignMaps':  ('author', 'campaign', 'timestampUnix'),
+    'OtherWarriors': ('campaign',),
+    'TotdMaps':      ('author', 'date', 'season', 'timestampUnix'),
+    'TotdWarriors':  ('date',),
+    'Zones':         ('parent',),
+}
+
+# map tables in the full-text index, and the SQL expression for each one's clean name
+search_names: dict[str, str] = {
+    'CampaignMaps': 'strip_format_codes(CampaignMaps.name)',
+    'TotdMaps':     'TotdMaps.nameClean',
+}
+
+# column definitions of tables which are rebuilt in full each run
+schemas: dict[str, str] = {
+    'CampaignMaps': '''
+        author        CHAR(36),
+        authorTime    INT,
+        bronzeTime    INT,
+        campaign      INT,
+        downloadUrl   CHAR(86),
+        goldTime      INT,
+        id            CHAR(36),
+        mapIndex      INT,
+        name          VARCHAR(16),
+        silverTime    INT,
+        submitter     CHAR(36),
+        thumbnailUrl  CHAR(90),
+        timestampIso  CHAR(25),
+        timestampUnix INT,
+        uid           VARCHAR(27) PRIMARY KEY
+    ''',
+    'TotdMaps': '''
+        author        CHAR(36),
+        authorTime    INT,
+        bronzeTime    INT,
+        date          CHAR(10),
+        downloadUrl   CHAR(86),
+        goldTime      INT,
+        id            CHAR(36),
+        mapIndex      INT,
+        nameClean     TEXT,
+        nameRaw       TEXT,
+        season        CHAR(36),
+        silverTime    INT,
+        submitter     CHAR(36),
+        thumbnailUrl  CHAR(90),
+        timestampIso  CHAR(25),
+        timestampUnix INT,
+        uid           VARCHAR(27) PRIMARY KEY
+    ''',
+    'Zones': '''
+        id       CHAR(36) PRIMARY KEY,
+        name     TEXT,
+        nameFull TEXT,
+        parent   CHAR(36)
+    ''',
+}
+
+
+def _columns(table: str) -> list[str]:
+    return [line.split()[0] for line in schemas[table].strip().splitlines()]
+
+
+def _create_account_names_table(cur: sql.Cursor) -> None:
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS AccountNames (
+            id      CHAR(36) PRIMARY KEY,
+            name    TEXT,
+            updated INT
+        )
+    ''')
+
+
+def _create_fingerprint_tables(cur: sql.Cursor) -> None:
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS Fingerprints (
+            changed INT,
+            dataset TEXT PRIMARY KEY,
+            hash    CHAR(64)
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS RowFingerprints (
+            dataset TEXT,
+            hash    CHAR(64),
+            key     TEXT,
+            PRIMARY KEY (dataset, key)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _fingerprint(data: dict | list) -> str:
+    return sha256(json.dumps(data, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def _insert_search_rows(cur: sql.Cursor, table: str, uids: list[str] | None) -> None:
+    query: str = f'''
+        INSERT INTO MapSearch (author, authorId, name, source, uid)
+        SELECT IFNULL(AccountNames.name, ''), {table}.author, {search_names[table]}, ?, {table}.uid
+        FROM {table}
+        LEFT JOIN AccountNames ON AccountNames.id = {table}.author
+    '''
+
+    if uids is None:
+        cur.execute(query, (table,))
+    else:
+        cur.execute(f'{query} WHERE {table}.uid IN (SELECT value FROM json_each(?))', (table, json.dumps(uids)))
+
+
+def _key_column(table: str) -> str:
+    return next(line.split()[0] for line in schemas[table].strip().splitlines() if 'PRIMARY KEY' in line)
+
+
+def _rebuild_table(table: str, rows: list[dict], on_swap: Callable[[sql.Cursor], None] | None = None) -> None:
+    '''
+    - fills a shadow table, validates it, then swaps it in with a rename
+    - the database is in WAL mode, so readers keep seeing the previous table until the swap commits
+    - if anything fails, the previous table is left untouched
+    - `on_swap` runs inside the swap transaction
+    '''
+
+    columns: list[str] = _columns(table)
+    shadow:  str       = f'{table}Shadow'
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN')
+        cur.execute(f'DROP TABLE IF EXISTS {shadow}')
+        cur.execute(f'CREATE TABLE {shadow} ({schemas[table]})')
+        cur.executemany(
+            f'INSERT INTO {shadow} ({', '.join(columns)}) VALUES ({', '.join(f':{column}' for column in columns)})',
+            rows
+        )
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN IMMEDIATE')
+
+        count: int = cur.execute(f'SELECT COUNT(*) FROM {shadow}').fetchone()[0]
+        if count == 0 or count != len(rows):
+            raise ValueError(f'{shadow} failed validation: {count} rows, expected {len(rows)}')
+
+        cur.execute(f'DROP TABLE IF EXISTS {table}')
+        cur.execute(f'ALTER TABLE {shadow} RENAME TO {table}')
+        create_indexes(cur, table)
+
+        if on_swap is not None:
+            on_swap(cur)
+
+
+def _search_index_exists(cur: sql.Cursor) -> bool:
+    return cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'MapSearch'").fetchone() is not None
+
+
+def _store_fingerprints(cur: sql.Cursor, dataset: str, dataset_hash: str, row_hashes: dict[str, str], deleted: list[str], stamp: int) -> None:
+    cur.executemany(
+        'REPLACE INTO RowFingerprints (dataset, hash, key) VALUES (?, ?, ?)',
+        [(dataset, hash, key) for key, hash in row_hashes.items()]
+    )
+    cur.executemany('DELETE FROM RowFingerprints WHERE dataset = ? AND key = ?', [(dataset, key) for key in deleted])
+    cur.execute(
+        'REPLACE INTO Fingerprints (changed, dataset, hash) VALUES (?, ?, ?)',
+        (stamp, dataset, dataset_hash)
+    )
+
+
+def _sync_table(table: str, rows: list[dict]) -> tuple[list[dict], list[str]]:
+    '''
+    - fingerprints the dataset and each row, then compares them with the fingerprints stored last time
+        - nothing changed: no write transaction at all
+        - table or fingerprints missing: rebuilds the whole table (see `_rebuild_table`)
+        - otherwise: applies only the new, changed and removed rows in one short transaction
+    - returns the rows which were inserted or updated, and the keys of rows which were deleted
+    '''
+
+    if not rows:
+        raise ValueError(f'refusing to write an empty dataset to {table}')
+
+    columns:    list[str] = _columns(table)
+    key_column: str       = _key_column(table)
+
+    rows = [{column: row[column] for column in columns} for row in rows]
+
+    row_hashes:   dict[str, str] = {str(row[key_column]): _fingerprint(row) for row in rows}
+    dataset_hash: str            = _fingerprint(sorted(row_hashes.items()))
+    stamp:        int            = int(time())
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        stored: tuple | None = None
+        if cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Fingerprints'").fetchone():
+            stored = cur.execute('SELECT hash FROM Fingerprints WHERE dataset = ?', (table,)).fetchone()
+
+        exists: bool = cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+        if exists and stored is not None and stored[0] == dataset_hash:
+            log(f'{table} unchanged, skipping write')
+            return [], []
+
+        if exists and stored is not None:
+            cur.execute('BEGIN IMMEDIATE')
+
+            stored_hashes: dict[str, str] = dict(cur.execute('SELECT key, hash FROM RowFingerprints WHERE dataset = ?', (table,)).fetchall())
+
+            upserted: list[dict] = [row for row in rows if stored_hashes.get(str(row[key_column])) != row_hashes[str(row[key_column])]]
+            deleted:  list[str]  = [key for key in stored_hashes if key not in row_hashes]
+
+            cur.executemany(
+                f'REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join(f':{column}' for column in columns)})',
+                upserted
+            )
+            cur.executemany(f'DELETE FROM {table} WHERE {key_column} = ?', [(key,) for key in deleted])
+
+            _store_fingerprints(
+                cur,
+                table,
+                dataset_hash,
+                {str(row[key_column]): row_hashes[str(row[key_column])] for row in upserted},
+                deleted,
+                stamp
+            )
+
+            log(f'{table}: {len(upserted)} rows changed, {len(deleted)} removed')
+            return upserted, deleted
+
+        deleted: list[str] = []
+        if exists:
+            deleted = [str(row[0]) for row in cur.execute(f'SELECT {key_column} FROM {table}') if str(row[0]) not in row_hashes]
+
+        cur.execute('BEGIN')
+        _create_fingerprint_tables(cur)
+
+    def on_swap(cur: sql.Cursor) -> None:
+        cur.execute('DELETE FROM RowFingerprints WHERE dataset = ?', (table,))
+        _store_fingerprints(cur, table, dataset_hash, row_hashes, [], stamp)
+
+    _rebuild_table(table, rows, on_swap)
+
+    return rows, deleted
+
+
+def _update_search_index(table: str, uids: list[str]) -> None:
+    '''
+    - keeps the `MapSearch` full-text index (see search.py) in step with `table`, for only the given UIDs
+    - the first time, creates the index and fills it from every map table instead
+    '''
+
+    if not uids:
+        return
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN')
+        _create_account_names_table(cur)
+
+        if not _search_index_exists(cur):
+            cur.execute('''
+                CREATE VIRTUAL TABLE MapSearch USING fts5(
+                    name,
+                    author,
+                    authorId UNINDEXED,
+                    source   UNINDEXED,
+                    uid      UNINDEXED,
+                    prefix   = '2 3',
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            ''')
+            cur.execute("CREATE VIRTUAL TABLE IF NOT EXISTS MapSearchVocab USING fts5vocab(MapSearch, 'row')")
+
+            for source in search_names:
+                if cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (source,)).fetchone():
+                    _insert_search_rows(cur, source, None)
+
+            return
+
+        cur.execute('DELETE FROM MapSearch WHERE uid IN (SELECT value FROM json_each(?))', (json.dumps(uids),))
+        _insert_search_rows(cur, table, uids)
+
+
+def _update_stats(period_types: tuple[str, ...], uids: list[str], deleted: list[str] | None = None) -> None:
+    '''
+    - refreshes the summary rows in `Stats` (see stats.py) for only the periods the given UIDs belong to
+    - deleted rows can't be traced back to their periods, so any deletion refreshes every period instead
+    '''
+
+    if not uids and not deleted:
+        return
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN')
+
+        for period_type in period_types:
+            refreshed: int = stats.refresh(cur, period_type, None if deleted else uids)
+            log(f'refreshed {refreshed} {period_type} stats')
+
+
+def connect() -> sql.Connection:
+    con: sql.Connection = sql.connect(db_file, timeout=30.0)
+    con.execute('PRAGMA journal_mode=WAL')
+    con.create_function('strip_format_codes', 1, strip_format_codes, deterministic=True)
+    return con
+
+
+def create_indexes(cur: sql.Cursor, table: str) -> None:
+    for column in indexes.get(table, ()):
+        cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})')
+
+
+def write_account_names(account_names: dict[str, str]) -> None:
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN')
+        _create_account_names_table(cur)
+
+        stamp: int = int(time())
+        cur.executemany(
+            'REPLACE INTO AccountNames (id, name, updated) VALUES (?, ?, ?)',
+            [(id, name, stamp) for id, name in account_names.items()]
+        )
+
+        if _search_index_exists(cur):
+            cur.executemany(
+                'UPDATE MapSearch SET author = ? WHERE authorId = ?',
+                [(name, id) for id, name in account_names.items()]
+            )
+
+
+def write_campaign_maps(campaign_maps: dict) -> None:
+    log('writing campaign maps to database')
+
+    upserted, deleted = _sync_table('CampaignMaps', [{**map, 'mapIndex': map['index']} for map in campaign_maps.values()])
+    _update_search_index('CampaignMaps', [row['uid'] for row in upserted] + deleted)
+    _update_stats(('campaign', 'warriorCampaign'), [row['uid'] for row in upserted], deleted)
+
+    log('wrote campaign maps to database')
+
+
+def write_campaign_warriors(warriors: dict) -> None:
+    log('writing campaign warriors to database')
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS CampaignWarriors (
+                authorTime  INT,
+                custom      INT,
+                name        TEXT,
+                reason      TEXT,
+                uid         VARCHAR(27) PRIMARY KEY,
+                warriorTime INT,
+                worldRecord INT
+            )
+        ''')
+
+        for uid, map in warriors.items():
+            cur.execute(f'''
+                INSERT INTO CampaignWarriors (
+                    authorTime,
+                    name,
+                    uid,
+                    warriorTime,
+                    worldRecord
+                ) VALUES (
+                    "{map['author_time']}",
+                    "{map['map_name']}",
+                    "{uid}",
+                    "{map['warrior_time']}",
+                    "{map['world_record']}"
+                )
+            ''')
+
+    _update_stats(('warriorCampaign',), list(warriors))
+
+    log('wrote campaign warriors to database')
+
+
+def write_other_warriors(warriors: dict) -> None:
+    log('writing other warriors to database')
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS OtherWarriors (
+                authorTime    INT,
+                campaign      TEXT,
+                campaignIndex INT,
+                custom        INT,
+                name          TEXT,
+                reason        TEXT,
+                uid           VARCHAR(27) PRIMARY KEY,
+                warriorTime   INT,
+                worldRecord   INT
+            )
+        ''')
+        create_indexes(cur, 'OtherWarriors')
+
+        for uid, map in warriors.items():
+            cur.execute(f'''
+                INSERT INTO OtherWarriors (
+                    authorTime,
+                    campaign,
+                    campaignIndex,
+                    name,
+                    uid,
+                    warriorTime,
+                    worldRecord
+                ) VALUES (
+                    "{map['authorTime']}",
+                    "{map['campaign']}",
+                    "{map['index']}",
+                    "{map['name']}",
+                    "{uid}",
+                    "{map['warriorTime']}",
+                    "{map['worldRecord']}"
+                )
+            ''')
+
+    _update_stats(('warriorOther',), list(warriors))
+
+    log('wrote other warriors to database')
+
+
+def write_totd_maps(totd_maps: dict) -> None:
+    log('writing TOTD maps to database')
+
+    upserted, deleted = _sync_table('TotdMaps', [{**map, 'mapIndex': map['index']} for map in totd_maps.values()])
+    _update_search_index('TotdMaps', [row['uid'] for row in upserted] + deleted)
+    _update_stats(('month', 'season'), [row['uid'] for row in upserted], deleted)
+
+    log('wrote TOTD maps to database')
+
+
+def write_totd_warriors(warriors: dict) -> None:
+    log('writing totd warriors to database')
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS TotdWarriors (
+                authorTime  INT,
+                custom      INT,
+                date        CHAR(10),
+                name        TEXT,
+                reason      TEXT,
+                uid         VARCHAR(27) PRIMARY KEY,
+                warriorTime INT,
+                worldRecord INT
+            )
+        ''')
+        create_indexes(cur, 'TotdWarriors')
+
+        for uid, map in warriors.items():
+            cur.execute(f'''
+                INSERT INTO TotdWarriors (
+                    authorTime,
+                    date,
+                    name,
+                    uid,
+                    warriorTime,
+                    worldRecord
+                ) VALUES (
+                    "{map['author_time']}",
+                    "{map['map_date']}",
+                    "{strip_format_codes(map['map_name'])}",
+                    "{uid}",
+                    "{map['warrior_time']}",
+                    "{map['world_record']}"
+                )
+            ''')
+
+    _update_stats(('warriorMonth',), list(warriors))
+
+    log('wrote totd warriors to database')
+
+
+def write_zones(zones: dict) -> None:
+    log('writing zones to database')
+
+    _sync_table('Zones', [{'id': id, **zone} for id, zone in zones.items()])
+
+    log('wrote zones to database')
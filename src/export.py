@@ -0,0 +1,174 @@
+# c 2026-10-19
+# m 2026-10-19
+
+from datetime import datetime as dt
+import gzip
+from hashlib import sha256
+import json
+import os
+import sqlite3 as sql
+
+try:
+    from . import db
+    from .util import log
+except ImportError:
+    import db
+    from util import log
+
+
+export_dir: str = f'{os.path.dirname(__file__)}/../export'
+
+# the last uploaded export (file hashes, warriors, generated stamp), which deltas are taken against - relative to `export_dir`
+uploaded_file: str = 'uploaded.json'
+pending_file:  str = 'pending.json'   # becomes `uploaded_file` once every upload succeeded
+
+# files sent to GitHub - the other formats are only for local use
+upload_full: str = 'warriors.json'
+
+
+def _dump_min(data: dict | list) -> bytes:
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def _is_uploaded(name: str) -> bool:
+    return name == upload_full or name.startswith('shards/')
+
+
+def _read_uploaded() -> dict:
+    if not os.path.isfile(f'{export_dir}/{uploaded_file}'):
+        return {'files': {}, 'generated': None, 'warriors': {}}
+
+    with open(f'{export_dir}/{uploaded_file}', 'rb') as f:
+        return json.loads(f.read())
+
+
+def _shard_name(table: str, record: dict) -> str:
+    if table == 'Totd' and record.get('date'):
+        return f'shards/totd/{record['date'][:7]}.json'
+
+    return f'shards/{table.lower()}.json'
+
+
+def _write_if_changed(name: str, content: bytes) -> bool:
+    path: str = f'{export_dir}/{name}'
+
+    if os.path.isfile(path):
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(content)
+
+    os.replace(f'{path}.tmp', path)
+
+    return True
+
+
+def export_warriors(warriors_by_table: dict[str, dict]) -> dict[str, bytes]:
+    '''
+    - writes every export format for the warriors to `export_dir`
+        - `warriors.json` - pretty-printed, same layout as before
+        - `warriors.min.json` - minified
+        - `warriors.json.gz` - gzipped minified
+        - `shards/totd/YYYY-MM.json`, `shards/campaign.json`, `shards/other.json` - one file per table/month
+        - `index.json` - manifest listing each shard's entry count, size and hash
+        - `delta.json` - only the entries changed or removed since the last uploaded export, whose stamp is `since`
+    - `warriors_by_table` is keyed by table prefix (`'Campaign'`, `'Totd'`, `'Other'`), then by UID
+    - returns files to upload which differ from the last uploaded export, keyed by path relative to `export_dir`
+        - only `upload_full`, the shards, `delta.json` and `index.json`
+        - until `mark_uploaded` is called, the same files (and a growing delta) are returned again
+    '''
+
+    log('exporting warriors')
+
+    generated: int = int(dt.now().timestamp())
+
+    warriors: dict = {}
+    shards:   dict = {}
+
+    for table, records in warriors_by_table.items():
+        for uid, record in records.items():
+            warriors[uid] = record
+            shards.setdefault(_shard_name(table, record), {})[uid] = record
+
+    uploaded: dict = _read_uploaded()
+    previous: dict = uploaded['warriors']
+
+    delta: dict = {
+        'changed':   {uid: record for uid, record in warriors.items() if previous.get(uid) != record},
+        'generated': generated,
+        'removed':   sorted(uid for uid in previous if uid not in warriors),
+        'since':     uploaded['generated']
+    }
+
+    files: dict[str, bytes] = {
+        'warriors.json':     json.dumps(warriors, indent=4).encode(),
+        'warriors.min.json': _dump_min(warriors)
+    }
+    files['warriors.json.gz'] = gzip.compress(files['warriors.min.json'], mtime=0)
+
+    manifest: dict = {
+        'count':  len(warriors),
+        'delta':  'delta.json',
+        'full':   upload_full,
+        'shards': {}
+    }
+
+    for name in sorted(shards):
+        content: bytes = _dump_min(shards[name])
+        files[name] = content
+
+        manifest['shards'][name] = {
+            'bytes':  len(content),
+            'count':  len(shards[name]),
+            'sha256': sha256(content).hexdigest()
+        }
+
+    for name, content in files.items():
+        _write_if_changed(name, content)
+
+    hashes: dict[str, str] = {name: sha256(content).hexdigest() for name, content in files.items() if _is_uploaded(name)}
+
+    changed: dict[str, bytes] = {name: files[name] for name, digest in hashes.items() if uploaded['files'].get(name) != digest}
+
+    # the manifest and delta always describe the latest export, but are only rewritten when data changed
+    if changed or delta['changed'] or delta['removed']:
+        manifest['generated'] = generated
+        for name, content in (('delta.json', _dump_min(delta)), ('index.json', _dump_min(manifest))):
+            _write_if_changed(name, content)
+            changed[name] = content
+
+        _write_if_changed(pending_file, _dump_min({'files': hashes, 'generated': generated, 'warriors': warriors}))
+
+    log(f'exported warriors ({len(delta['changed'])} changed, {len(delta['removed'])} removed, {len(changed)} files to upload)')
+
+    return changed
+
+
+def load_warriors() -> dict[str, dict]:
+    warriors: dict = {}
+
+    with sql.connect(db.db_file) as con:
+        con.row_factory = sql.Row
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN')
+        for table in ('Campaign', 'Totd', 'Other'):
+            warriors[table] = {}
+            for record in cur.execute(f'SELECT * FROM {table}Warriors').fetchall():
+                warriors[table][record['uid']] = dict(record)
+
+    return warriors
+
+
+def mark_uploaded() -> None:
+    '''
+    - makes the export last returned by `export_warriors` the baseline for the next delta
+    - only call once every returned file was uploaded
+    '''
+
+    if os.path.isfile(f'{export_dir}/{pending_file}'):
+        os.replace(f'{export_dir}/{pending_file}', f'{export_dir}/{uploaded_file}')
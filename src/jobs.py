@@ -0,0 +1,210 @@
+# c 2026-10-19
+# m 2026-10-19
+
+from dataclasses import dataclass
+from datetime import datetime as dt
+import json
+import multiprocessing as mp
+import os
+import signal
+from threading import Lock, Thread
+from time import sleep, time
+from typing import Callable
+from zoneinfo import ZoneInfo as tz
+
+try:
+    from .util import log
+except ImportError:
+    from util import log
+
+
+status_file: str = f'{os.path.dirname(__file__)}/../jobs.json'
+
+_processes:   dict[str, mp.process.BaseProcess] = {}
+_status_lock: Lock                               = Lock()
+
+
+@dataclass
+class Job():
+    '''
+    - a job scheduled daily at `hour`:`minute` Paris time
+    - each run gets its own process, so a stuck job can be killed without touching any other
+    - `deadline` covers every attempt, including waits between them
+    '''
+
+    name:                  str
+    func:                  Callable[[], None]
+    hour:                  int
+    minute:                int
+    deadline:              float = 900.0
+    attempts:              int   = 10
+    wait_between_attempts: float = 10.0
+    alert_webhook_env:     str   = ''
+
+
+def _alert(job: Job, reason: str) -> None:
+    if not job.alert_webhook_env:
+        return
+
+    try:
+        from discord_webhook import DiscordWebhook
+
+        try:
+            from . import net
+        except ImportError:
+            import net
+
+        net.execute_webhook(DiscordWebhook(
+            os.environ[job.alert_webhook_env],
+            content=f'<@174350279158792192> ERROR ({job.name}, {reason}): CHECK SERVER LOGS'
+        ))
+    except Exception as e:
+        log(f'ERROR (alert {job.name}): {type(e)} | {e}')
+
+
+def _attempt_loop(name: str, func: Callable[[], None], attempts: int, wait_between_attempts: float) -> None:
+    # runs in the job's own process
+    for i in range(attempts):
+        try:
+            func()
+            return
+        except Exception as e:
+            log(f'ERROR ({name}): {type(e)} | {e} | attempt {i + 1}/{attempts} failed, waiting {wait_between_attempts} seconds')
+
+            if i < attempts - 1:
+                sleep(wait_between_attempts)
+
+    log(f'ERROR ({name}): max attempts reached')
+    raise SystemExit(1)
+
+
+def _set_status(name: str, **fields) -> None:
+    with _status_lock:
+        status: dict = get_status()
+        status.setdefault(name, {}).update(fields)
+
+        with open(f'{status_file}.tmp', 'w', newline='\n') as f:
+            json.dump(status, f, indent=4)
+
+        os.replace(f'{status_file}.tmp', status_file)
+
+
+def _supervise(job: Job) -> None:
+    start: float = time()
+
+    proc: mp.process.BaseProcess = mp.get_context('spawn').Process(
+        target=_attempt_loop,
+        args=(job.name, job.func, job.attempts, job.wait_between_attempts),
+        name=f'job-{job.name}',
+        daemon=True
+    )
+
+    _processes[job.name] = proc
+    _set_status(job.name, state='running', lastStart=int(start))
+    log(f'starting job {job.name} (deadline {job.deadline} seconds)')
+
+    proc.start()
+    _set_status(job.name, pid=proc.pid)  # so `cancel` works from another process
+    proc.join(job.deadline)
+
+    reason: str = ''
+
+    if proc.is_alive():
+        reason = f'timed out after {job.deadline} seconds'
+        proc.terminate()
+        proc.join(5)
+
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
+
+    elif proc.exitcode != 0:
+        reason = 'cancelled' if proc.exitcode < 0 else 'max attempts reached'
+
+    _processes.pop(job.name, None)
+
+    if reason:
+        log(f'ERROR (job {job.name}): {reason}')
+        _set_status(job.name, state='idle', pid=None, lastFailure=int(time()), lastError=reason)
+        _alert(job, reason)
+    else:
+        log(f'finished job {job.name} in {round(time() - start, 1)} seconds')
+        _set_status(job.name, state='idle', pid=None, lastSuccess=int(time()))
+
+
+def cancel(name: str) -> bool:
+    '''
+    - stops the running job `name`, which its supervisor then records as cancelled
+    - works from outside the scheduler's process too, through the job's PID in `status_file`
+    - returns whether there was a running job to cancel
+    '''
+
+    if (proc := _processes.get(name)) is not None:
+        if not proc.is_alive():
+            return False
+
+        log(f'cancelling job {name}')
+        proc.terminate()
+        return True
+
+    status: dict = get_status().get(name, {})
+
+    if status.get('state') != 'running' or not status.get('pid'):
+        return False
+
+    log(f'cancelling job {name} (pid {status['pid']})')
+
+    try:
+        os.kill(status['pid'], signal.SIGTERM)
+    except ProcessLookupError:  # already finished
+        return False
+
+    return True
+
+
+def get_status() -> dict:
+    '''
+    - per job: `state` (`'running'`/`'idle'`), `pid` of the running job's process, and Unix timestamps `lastStart`, `lastSuccess`, `lastFailure` plus `lastError`
+    - read from `status_file`, so it works from another process while the scheduler is running
+    '''
+
+    if not os.path.isfile(status_file):
+        return {}
+
+    with open(status_file) as f:
+        return json.loads(f.read())
+
+
+def run_scheduler(jobs: list[Job]) -> None:
+    '''
+    - starts each job when its time comes, on its own supervisor thread, so jobs never wait on each other
+    - a job still running at its next start time is skipped for that day
+    '''
+
+    last_started: dict[str, str] = {}
+
+    for job in jobs:
+        _set_status(job.name, state='idle')
+
+    try:
+        while True:
+            now_paris = dt.now(tz('Europe/Paris'))
+            minute:   str = now_paris.strftime('%Y-%m-%d %H:%M')
+
+            for job in jobs:
+                if now_paris.hour != job.hour or now_paris.minute != job.minute or last_started.get(job.name) == minute:
+                    continue
+
+                last_started[job.name] = minute
+
+                if job.name in _processes:
+                    log(f'ERROR (job {job.name}): previous run still going, skipping')
+                    continue
+
+                Thread(target=_supervise, args=(job,), name=f'supervise-{job.name}', daemon=True).start()
+
+            sleep(1)
+
+    finally:
+        for name in list(_processes):
+            cancel(name)
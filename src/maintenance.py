@@ -1,109 +1,240 @@
 # c 2024-08-25
-# m 2024-08-25
+# m 2026-10-19
 
-import json
+import os
+import re
 import sqlite3 as sql
+from typing import Callable
 
-import app
+import db
+import stats
 import util
 
 
-def add_campaign_index_to_other_warriors() -> None:
-    # ret: dict = {}
+chunk_size:  int   = 5000
+totd_factor: float = 0.125
 
-    with sql.connect(app.db_file) as con:
-    #     con.row_factory = sql.Row
-        cur: sql.Cursor = con.cursor()
 
-    #     cur.execute('BEGIN')
-    #     for val in cur.execute('SELECT * FROM OtherWarriors').fetchall():
-    #         ret[val['uid']] = dict(val)
+def _connect(path: str = '') -> sql.Connection:
+    # autocommit, so each chunk controls its own transaction
+    con: sql.Connection = sql.connect(path or db.db_file, isolation_level=None, timeout=30.0)
+    con.execute('PRAGMA journal_mode=WAL')
+    con.execute('''
+        CREATE TABLE IF NOT EXISTS MigrationProgress (
+            lastRowid INT,
+            task      TEXT PRIMARY KEY
+        )
+    ''')
+    return con
 
-    #     index: int = 0
-    #     last_campaign: str = ''
-    #     for uid, val in ret.items():
-    #         map: dict = ret[uid]
 
-    #         if last_campaign != map['campaign']:
-    #             last_campaign = map['campaign']
-    #             index = 0
+def _has_column(con: sql.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in con.execute(f'PRAGMA table_info({table})').fetchall())
 
-    #         map['index'] = index
-    #         index += 1
 
-    #     with open('OtherWarriors.json', 'a', newline='\n') as f:
-    #         json.dump(ret, f, indent=4)
+def _refresh_stats(con: sql.Connection, period_type: str) -> None:
+    # summaries are otherwise only refreshed by db.write_*, which never sees rows changed here
+    con.execute('BEGIN IMMEDIATE')
+    refreshed: int = stats.refresh(con.cursor(), period_type)
+    con.execute('COMMIT')
 
-        cur.execute('DROP TABLE OtherWarriors')
+    util.log(f'refreshed {refreshed} {period_type} stats')
 
-    with open('OtherWarriors.json') as f:
-        ret: dict = json.loads(f.read())
 
-    app.write_other_warriors(ret)
+def _table_exists(con: sql.Connection, table: str, schema: str = 'main') -> bool:
+    return con.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
 
-    pass
+
+def run_chunked(con: sql.Connection, task: str, table: str, statement: str) -> int:
+    '''
+    - runs set-based `statement` over `table` one rowid range at a time, each in its own transaction
+        - `statement` must limit itself with the named parameters `:start` and `:end` (inclusive rowids)
+    - progress is saved in the same transaction as each chunk, so an interrupted run resumes where it stopped
+    - memory use is bounded by `chunk_size`, not by the size of the table
+    - returns the number of rows changed
+    '''
+
+    row: tuple | None = con.execute('SELECT lastRowid FROM MigrationProgress WHERE task = ?', (task,)).fetchone()
+
+    start:   int = row[0] + 1 if row is not None else 1
+    last:    int = con.execute(f'SELECT IFNULL(MAX(rowid), 0) FROM {table}').fetchone()[0]
+    changed: int = 0
+
+    if start > 1:
+        util.log(f'resuming {task} from rowid {start}')
+
+    while start <= last:
+        end: int = start + chunk_size - 1
+
+        con.execute('BEGIN IMMEDIATE')
+        changed += con.execute(statement, {'end': end, 'start': start}).rowcount
+        con.execute('REPLACE INTO MigrationProgress (lastRowid, task) VALUES (?, ?)', (end, task))
+        con.execute('COMMIT')
+
+        start = end + 1
+
+    con.execute('DELETE FROM MigrationProgress WHERE task = ?', (task,))
+
+    return changed
+
+
+def add_campaign_index_to_other_warriors(con: sql.Connection) -> None:
+    if not _table_exists(con, 'OtherWarriors'):
+        return
+
+    if not _has_column(con, 'OtherWarriors', 'campaignIndex'):
+        con.execute('ALTER TABLE OtherWarriors ADD COLUMN campaignIndex INT')
+
+    # position within each campaign, in insertion order - computed once, then applied in chunks
+    # only to rows without one, since write_other_warriors already stores the real index
+    con.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS CampaignIndexes AS
+        SELECT
+            rowid AS id,
+            ROW_NUMBER() OVER (PARTITION BY campaign ORDER BY rowid) - 1 AS campaignIndex
+        FROM OtherWarriors
+    ''')
+
+    changed: int = run_chunked(con, '1_campaign_index', 'OtherWarriors', '''
+        UPDATE OtherWarriors
+        SET campaignIndex = CampaignIndexes.campaignIndex
+        FROM CampaignIndexes
+        WHERE
+            OtherWarriors.rowid = CampaignIndexes.id
+            AND OtherWarriors.rowid BETWEEN :start AND :end
+            AND OtherWarriors.campaignIndex IS NULL
+    ''')
+
+    con.execute('DROP TABLE temp.CampaignIndexes')
+
+    util.log(f'set campaign index on {changed} other warriors')
+
+    _refresh_stats(con, 'warriorOther')
+
+
+def compact_into(path: str) -> None:
+    '''
+    - copies every table and index into a fresh database file at `path` through `ATTACH`, in chunks
+    - rows never pass through Python, and an interrupted copy resumes
+    - virtual tables (the FTS5 search index) are recreated rather than copied through their shadow tables
+    - the original file is left alone - swap the files while the jobs are stopped
+    '''
+
+    con: sql.Connection = _connect()
+
+    # progress is per target file - a fresh target must not resume from an earlier, abandoned copy
+    task_prefix: str = f'compact {os.path.abspath(path)} '
+
+    if not os.path.isfile(path):
+        con.execute("DELETE FROM MigrationProgress WHERE task LIKE 'compact%'")
+
+    con.execute('ATTACH DATABASE ? AS new', (path,))
+
+    objects: list[tuple] = con.execute('''
+        SELECT type, name, tbl_name, sql
+        FROM main.sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' AND name != 'MigrationProgress'
+        ORDER BY type DESC, rowid
+    ''').fetchall()  # tables before indexes, virtual tables before those built on them
+
+    virtual: list[str] = [name for kind, name, _, create in objects if kind == 'table' and create.upper().startswith('CREATE VIRTUAL TABLE')]
+
+    for kind, name, table, create in objects:
+        if any(name.startswith(f'{parent}_') for parent in virtual):
+            continue  # shadow table, filled by its virtual table
+
+        if name in virtual:
+            con.execute(re.sub(r'^CREATE VIRTUAL TABLE (IF NOT EXISTS )?"?\w+"?', f'CREATE VIRTUAL TABLE IF NOT EXISTS new.{name}', create, flags=re.I))
+
+            if re.search(r'USING\s+fts5\s*\(', create, flags=re.I):  # fts5vocab tables have no content of their own
+                columns: str = ', '.join(row[1] for row in con.execute(f'PRAGMA main.table_info({name})'))
+
+                con.execute('BEGIN IMMEDIATE')
+                con.execute(f'DELETE FROM new.{name}')
+                copied: int = con.execute(f'INSERT INTO new.{name} (rowid, {columns}) SELECT rowid, {columns} FROM main.{name}').rowcount
+                con.execute('COMMIT')
+
+                util.log(f'copied {copied} rows of {name} into {path}')
+
+        elif kind == 'table':
+            if not _table_exists(con, name, 'new'):
+                con.execute(re.sub(r'^CREATE TABLE (IF NOT EXISTS )?"?\w+"?', f'CREATE TABLE new.{name}', create, flags=re.I))
+
+            if 'WITHOUT ROWID' in create.upper():  # no rowid to chunk on, these are small bookkeeping tables
+                con.execute('BEGIN IMMEDIATE')
+                copied: int = con.execute(f'INSERT OR REPLACE INTO new.{name} SELECT * FROM main.{name}').rowcount
+                con.execute('COMMIT')
+            else:
+                copied: int = run_chunked(con, f'{task_prefix}{name}', name, f'''
+                    INSERT OR REPLACE INTO new.{name}
+                    SELECT * FROM main.{name} WHERE rowid BETWEEN :start AND :end
+                ''')
+
+            util.log(f'copied {copied} rows of {name} into {path}')
+
+        elif kind == 'index':
+            con.execute(re.sub(r'^CREATE (UNIQUE )?INDEX (IF NOT EXISTS )?"?(\w+)"?', r'CREATE \1INDEX IF NOT EXISTS new.\3', create, flags=re.I))
+
+    con.execute('DETACH DATABASE new')
+    con.close()
+
+
+def migrate() -> None:
+    '''
+    - applies every migration newer than the database's `user_version`, in order
+    - each migration is resumable, and the version only moves forward once it has finished
+    '''
+
+    con: sql.Connection = _connect()
+    version: int = con.execute('PRAGMA user_version').fetchone()[0]
+
+    for number, func in migrations:
+        if number <= version:
+            continue
+
+        util.log(f'running migration {number} ({func.__name__})')
+        func(con)
+        con.execute(f'PRAGMA user_version = {number}')
+        util.log(f'finished migration {number}')
+
+    con.close()
 
 
 def recalculate_totd_warriors() -> None:
-    maps: dict = {}
-
-    with sql.connect(app.db_file) as con:
-        con.row_factory = sql.Row
-        cur: sql.Cursor = con.cursor()
-
-        cur.execute('BEGIN')
-        for val in cur.execute('SELECT * FROM TotdWarriors').fetchall():
-            maps[val['uid']] = dict(val)
-
-    with open('totd_warrior_changes.txt', 'a', newline='\n') as f:
-        i: int = 0
-
-        for uid, map in maps.items():
-            new_warrior: int = app.get_warrior_time(map['authorTime'], map['worldRecord'], True)
-
-            if map['warriorTime'] != new_warrior:
-                # line: str = f'{map['date']}: {util.format_race_time(map['warriorTime'])} -> {util.format_race_time(new_warrior)}'
-                # print(line)
-                # f.write(f'{line}\n')
-                map['warriorTime'] = new_warrior
-                i += 1
-
-        print(f'found {i}/{len(maps)} incorrect warrior times')
-
-    with sql.connect(app.db_file) as con:
-        cur: sql.Cursor = con.cursor()
-
-        cur.execute('BEGIN')
-
-        for uid, map in maps.items():
-            cur.execute(f'''
-                REPLACE INTO TotdWarriors (
-                    authorTime,
-                    custom,
-                    date,
-                    name,
-                    reason,
-                    uid,
-                    warriorTime,
-                    worldRecord
-                ) VALUES (
-                    "{map['authorTime']}",
-                    "{map['custom']}",
-                    "{map['date']}",
-                    "{map['name']}",
-                    "{map['reason']}",
-                    "{uid}",
-                    "{map['warriorTime']}",
-                    "{map['worldRecord']}"
-                )
-            ''')
-
-    pass
+    if not os.path.isfile(db.db_file):
+        return
+
+    con: sql.Connection = _connect()
+
+    if not _table_exists(con, 'TotdWarriors'):
+        con.close()
+        return
+
+    # same formula as util.get_warrior_time
+    changed: int = run_chunked(con, 'recalculate_totd_warriors', 'TotdWarriors', f'''
+        UPDATE TotdWarriors
+        SET warriorTime = authorTime - MAX(CAST((authorTime - worldRecord) * {totd_factor} AS INT), 1)
+        WHERE
+            rowid BETWEEN :start AND :end
+            AND warriorTime IS NOT authorTime - MAX(CAST((authorTime - worldRecord) * {totd_factor} AS INT), 1)
+    ''')
+
+    util.log(f'found {changed} incorrect warrior times')
+
+    if changed:
+        _refresh_stats(con, 'warriorMonth')
+
+    con.close()
+
+
+# (version, migration) - append only, never renumber
+migrations: list[tuple[int, Callable[[sql.Connection], None]]] = [
+    (1, add_campaign_index_to_other_warriors),
+]
 
 
 def main() -> None:
-    # recalculate_totd_warriors()
-    pass
+    migrate()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,172 @@
+# c 2026-10-19
+# m 2026-10-19
+
+from concurrent.futures import as_completed, ThreadPoolExecutor
+from hashlib import sha256
+import os
+import sqlite3 as sql
+from threading import get_ident
+from time import time
+from urllib.parse import urlparse
+
+try:
+    from . import net
+    from .db import connect
+    from .util import log
+except ImportError:
+    import net
+    from db import connect
+    from util import log
+
+
+batch_size: int = 100             # rows recorded per transaction
+mirror_dir: str = f'{os.path.dirname(__file__)}/../mirror'
+workers:    int = net.pool_size   # one per pooled connection, more would only wait on the pool
+
+# (table, URL column) pairs to mirror
+sources: tuple[tuple[str, str], ...] = (
+    ('CampaignMaps', 'downloadUrl'),
+    ('CampaignMaps', 'thumbnailUrl'),
+    ('TotdMaps',     'downloadUrl'),
+    ('TotdMaps',     'thumbnailUrl'),
+)
+
+extensions: dict[str, str] = {
+    'image/jpeg': '.jpg',
+    'image/png':  '.png',
+    'image/webp': '.webp',
+}
+
+
+def _create_table(cur: sql.Cursor) -> None:
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS Mirror (
+            fetched INT,
+            hash    CHAR(64),
+            path    TEXT,
+            size    INT,
+            url     TEXT PRIMARY KEY
+        )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_Mirror_hash ON Mirror (hash)')
+
+
+def _extension(url: str, content_type: str) -> str:
+    if (ext := os.path.splitext(urlparse(url).path)[1].lower()):
+        return ext
+
+    return extensions.get(content_type.split(';')[0].strip(), '.Map.Gbx')  # map file URLs have no extension
+
+
+def _fetch(url: str) -> dict:
+    # runs on a worker thread - only touches the network and the file system, never the database
+    # straight through the session, so binaries never end up in a recorded cassette
+    req = net.get_session().get(url, timeout=net.timeout)
+
+    if req.status_code >= 400:
+        raise ConnectionError(f'Bad response from {urlparse(url).netloc}: code {req.status_code}')
+
+    content_hash: str = sha256(req.content).hexdigest()
+    path:         str = f'{content_hash[:2]}/{content_hash}{_extension(url, req.headers.get('Content-Type', ''))}'
+    full_path:    str = f'{mirror_dir}/{path}'
+
+    if not os.path.isfile(full_path):  # same content under another URL is only stored once
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        with open(f'{full_path}.{get_ident()}.tmp', 'wb') as f:
+            f.write(req.content)
+
+        os.replace(f'{full_path}.{get_ident()}.tmp', full_path)
+
+    return {'fetched': int(time()), 'hash': content_hash, 'path': path, 'size': len(req.content), 'url': url}
+
+
+def _pending_urls(cur: sql.Cursor) -> list[str]:
+    selects: list[str] = [
+        f'SELECT {column} AS url FROM {table}'
+        for table, column in sources
+        if cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    ]
+
+    if not selects:
+        return []
+
+    return [row[0] for row in cur.execute(f'''
+        SELECT DISTINCT url
+        FROM ({' UNION '.join(selects)})
+        WHERE url IS NOT NULL AND url != '' AND url NOT IN (SELECT url FROM Mirror)
+    ''')]
+
+
+def _record(rows: list[dict]) -> None:
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+
+        cur.execute('BEGIN')
+        cur.executemany('REPLACE INTO Mirror (fetched, hash, path, size, url) VALUES (:fetched, :hash, :path, :size, :url)', rows)
+
+
+def local_path(url: str) -> str | None:
+    '''
+    - path of the mirrored copy of `url` (a map's `thumbnailUrl` or `downloadUrl`), or `None` if not mirrored yet
+    '''
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+        _create_table(cur)
+        row: tuple | None = cur.execute('SELECT path FROM Mirror WHERE url = ?', (url,)).fetchone()
+
+    return f'{mirror_dir}/{row[0]}' if row is not None else None
+
+
+def run_mirror() -> int:
+    '''
+    - downloads every thumbnail and map file URL in the map tables which isn't mirrored yet, `workers` at a time
+    - files are stored under `mirror_dir` by content hash, so identical files are kept once
+    - URLs already in `Mirror` are never requested again, so a daily run only fetches the new maps' files
+    - a failed download is logged and retried on the next run
+    - progress is saved every `batch_size` files, so a run stopped at its deadline carries on where it left off next time
+    - skipped while replaying a cassette, since mirror traffic is never recorded
+    - returns the number of URLs mirrored
+    '''
+
+    if net.replaying():
+        log('replaying, not mirroring')
+        return 0
+
+    with connect() as con:
+        cur: sql.Cursor = con.cursor()
+        _create_table(cur)
+        urls: list[str] = _pending_urls(cur)
+
+    if not urls:
+        log('mirror is up to date')
+        return 0
+
+    log(f'mirroring {len(urls)} files')
+
+    rows:     list[dict] = []
+    mirrored: int        = 0
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mirror') as executor:
+        futures: dict = {executor.submit(_fetch, url): url for url in urls}
+
+        for future in as_completed(futures):
+            try:
+                rows.append(future.result())
+            except Exception as e:
+                log(f'ERROR (mirror {futures[future]}): {type(e)} | {e}')
+                continue
+
+            if len(rows) >= batch_size:
+                _record(rows)
+                mirrored += len(rows)
+                rows = []
+
+    if rows:
+        _record(rows)
+        mirrored += len(rows)
+
+    log(f'mirrored {mirrored}/{len(urls)} files')
+
+    return mirrored
@@ -0,0 +1,260 @@
+# c 2026-10-19
+# m 2026-10-19
+
+import atexit
+from base64 import b64decode, b64encode
+from collections import deque
+import json
+import os
+import re
+from threading import Lock
+from time import perf_counter, sleep
+from typing import Iterable
+
+from nadeo_api import auth
+from requests import RequestException, Response, Session
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+
+pool_size: int                 = 10
+timeout:   tuple[float, float] = (5.0, 30.0)  # (connect, read) seconds
+
+_cassette:      dict | None    = None
+_cassette_lock: Lock           = Lock()
+_session:       Session | None = None
+_session_lock:  Lock           = Lock()
+
+
+def _interaction_key(method: str, url: str, params: dict | None) -> str:
+    # request bodies aren't part of the key since some contain timestamps (e.g. GitHub commit messages)
+    return f'{method.upper()} {_redact_url(url)} {json.dumps(params or {}, sort_keys=True)}'
+
+
+def _record(key: str, req: Response, elapsed: float) -> None:
+    try:
+        content: dict = {'text': req.content.decode('utf-8')}
+    except UnicodeDecodeError:
+        content = {'base64': b64encode(req.content).decode()}
+
+    with _cassette_lock:
+        _cassette['interactions'].append({
+            'content':     content,
+            'contentType': req.headers.get('Content-Type', ''),
+            'elapsed':     round(elapsed, 4),
+            'key':         key,
+            'status':      req.status_code
+        })
+
+
+def _redact_url(url: str) -> str:
+    # webhook URLs carry their secret in the path
+    return re.sub(r'(/api/webhooks/\d+)/[^/?]+', r'\1/REDACTED', url)
+
+
+def _replay(key: str) -> Response:
+    with _cassette_lock:
+        queue: deque | None = _cassette['queues'].get(key)
+
+        if not queue:
+            raise ConnectionError(f'no recorded response left in cassette for {key}')
+
+        interaction: dict = queue.popleft()
+
+    if _cassette['latency'] is not None:
+        sleep(_cassette['latency'] if _cassette['latency'] >= 0 else interaction['elapsed'])
+
+    req: Response = Response()
+    req.status_code = interaction['status']
+    req.headers     = CaseInsensitiveDict({'Content-Type': interaction['contentType']})
+    req.url         = key.split(' ')[1]
+    req.encoding    = 'utf-8'
+    req._content    = (
+        interaction['content']['text'].encode('utf-8')
+        if 'text' in interaction['content']
+        else b64decode(interaction['content']['base64'])
+    )
+
+    return req
+
+
+def execute_webhook(webhook) -> Response:
+    '''
+    - sends a `DiscordWebhook` through the shared session instead of its own connection
+    - retries once if Discord rate limits the request
+    '''
+
+    req: Response = post(webhook.url, json=webhook.json)
+
+    if req.status_code == 429:
+        sleep(float(req.json().get('retry_after', 1)) + 0.15)
+        req = post(webhook.url, json=webhook.json)
+
+    if req.status_code >= 400:
+        raise ConnectionError(f'Bad response from Discord: code {req.status_code}, response {req.text}')
+
+    return req
+
+
+def get(url: str, **kwargs) -> Response:
+    return request('get', url, **kwargs)
+
+
+def get_placeholder_token(audience: str) -> auth.Token:
+    '''
+    - token which never expires, for use while replaying a cassette
+    '''
+
+    return auth.Token('nadeo_v1 t=e30.e30.replay', audience, expiration=2 ** 31 - 1)
+
+
+def get_session() -> Session:
+    '''
+    - one keep-alive session shared by every outbound call so each host is only handshaked once per process
+    - idempotent requests are retried on connection errors and 5xx responses
+    '''
+
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            retry: Retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(500, 502, 503, 504),
+                raise_on_status=False
+            )
+
+            adapter: HTTPAdapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+            session: Session = Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection':      'keep-alive'
+            })
+
+            if (agent := os.environ.get('TM_E416DEV_AGENT')):
+                session.headers['User-Agent'] = agent
+
+            _session = session
+
+    return _session
+
+
+def nadeo_get(token: auth.Token, base_url: str, endpoint: str, params: dict = {}) -> dict | list:
+    '''
+    - sends a GET request to a Nadeo API through the shared session
+    - `nadeo_api` does not accept a session, so this mirrors its request handling (token refresh, 401 retry)
+    '''
+
+    if token.expired:
+        token.refresh()
+
+    url: str = f'{base_url}/{endpoint.lstrip('/')}'
+
+    req: Response = get(url, params=params, headers={'Authorization': token.access_token})
+
+    if req.status_code == 401:  # token may have expired prematurely
+        token.refresh()
+        req = get(url, params=params, headers={'Authorization': token.access_token})
+
+    if req.status_code >= 400:
+        raise ConnectionError(f'Bad response from {base_url}: code {req.status_code}, response {req.text}')
+
+    return req.json()
+
+
+def post(url: str, **kwargs) -> Response:
+    return request('post', url, **kwargs)
+
+
+def put(url: str, **kwargs) -> Response:
+    return request('put', url, **kwargs)
+
+
+def replaying() -> bool:
+    return _cassette is not None and _cassette['mode'] == 'replay'
+
+
+def request(method: str, url: str, **kwargs) -> Response:
+    if _cassette is None:
+        kwargs.setdefault('timeout', timeout)
+        return get_session().request(method.upper(), url, **kwargs)
+
+    key: str = _interaction_key(method, url, kwargs.get('params'))
+
+    if _cassette['mode'] == 'replay':
+        return _replay(key)
+
+    kwargs.setdefault('timeout', timeout)
+
+    start: float = perf_counter()
+    req: Response = get_session().request(method.upper(), url, **kwargs)
+    _record(key, req, perf_counter() - start)
+
+    return req
+
+
+def save_cassette() -> None:
+    if _cassette is None or _cassette['mode'] != 'record':
+        return
+
+    with _cassette_lock:
+        with open(f'{_cassette['path']}.tmp', 'w', newline='\n') as f:
+            json.dump({'interactions': _cassette['interactions']}, f, indent=4)
+
+        os.replace(f'{_cassette['path']}.tmp', _cassette['path'])
+
+
+def set_cassette(path: str, mode: str, latency: float | None = None) -> None:
+    '''
+    - `mode` is one of:
+        - `'record'` - sends requests as normal and saves every response to `path` on exit
+        - `'replay'` - serves responses from `path` in recorded order, never touching the network
+    - `latency` only applies when replaying:
+        - `None` - respond immediately (default)
+        - `>= 0` - sleep this many seconds before each response
+        - `< 0` - sleep for as long as the recorded request took
+    - request headers are never recorded, and webhook secrets are redacted from URLs
+    '''
+
+    global _cassette
+
+    if mode not in ('record', 'replay'):
+        raise ValueError(f'Given cassette mode is invalid: {mode}')
+
+    cassette: dict = {
+        'interactions': [],
+        'latency':      latency,
+        'mode':         mode,
+        'path':         path,
+        'queues':       {}
+    }
+
+    if mode == 'replay':
+        with open(path) as f:
+            for interaction in json.loads(f.read())['interactions']:
+                cassette['queues'].setdefault(interaction['key'], deque()).append(interaction)
+    else:
+        atexit.register(save_cassette)
+
+    _cassette = cassette
+
+
+def warm(urls: Iterable[str]) -> None:
+    '''
+    - opens a pooled connection to each URL's host ahead of time so the first real request skips the handshake
+    - not recorded in cassettes, and skipped while replaying
+    '''
+
+    if replaying():
+        return
+
+    for url in urls:
+        try:
+            get_session().head(url, timeout=timeout)
+        except RequestException:
+            pass  # only here to open the connection, the response doesn't matter
@@ -0,0 +1,169 @@
+# c 2026-10-19
+# m 2026-10-19
+
+import sqlite3 as sql
+from threading import local
+from typing import TypedDict
+
+try:
+    from . import db
+except ImportError:
+    import db
+
+
+class CampaignMap(TypedDict):
+    author:        str
+    authorTime:    int
+    bronzeTime:    int
+    campaign:      int
+    downloadUrl:   str
+    goldTime:      int
+    id:            str
+    mapIndex:      int
+    name:          str
+    silverTime:    int
+    submitter:     str
+    thumbnailUrl:  str
+    timestampIso:  str
+    timestampUnix: int
+    uid:           str
+
+
+class TotdMap(TypedDict):
+    author:        str
+    authorTime:    int
+    bronzeTime:    int
+    date:          str
+    downloadUrl:   str
+    goldTime:      int
+    id:            str
+    mapIndex:      int
+    nameClean:     str
+    nameRaw:       str
+    season:        str
+    silverTime:    int
+    submitter:     str
+    thumbnailUrl:  str
+    timestampIso:  str
+    timestampUnix: int
+    uid:           str
+
+
+class Zone(TypedDict):
+    id:       str
+    name:     str
+    nameFull: str
+    parent:   str | None  # None for the World zone
+
+
+# sqlite caches prepared statements per connection (keyed by SQL text), so keep one open connection per thread
+_local = local()
+
+
+def _get_connection() -> sql.Connection:
+    if getattr(_local, 'con', None) is not None and _local.path != db.db_file:  # database moved (e.g. `--state-dir`)
+        close()
+
+    if getattr(_local, 'con', None) is None:
+        con: sql.Connection = sql.connect(db.db_file, cached_statements=64)
+        con.row_factory = sql.Row
+        _local.con  = con
+        _local.path = db.db_file
+
+    return _local.con
+
+
+def _fetch_all(query: str, params: tuple) -> list[dict]:
+    return [dict(row) for row in _get_connection().execute(query, params).fetchall()]
+
+
+def _fetch_one(query: str, params: tuple) -> dict | None:
+    row: sql.Row | None = _get_connection().execute(query, params).fetchone()
+    return dict(row) if row is not None else None
+
+
+def _table_exists(table: str) -> bool:
+    return _fetch_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)) is not None
+
+
+def close() -> None:
+    if getattr(_local, 'con', None) is not None:
+        _local.con.close()
+        _local.con = None
+
+
+def get_account_names() -> dict[str, str]:
+    if not _table_exists('AccountNames'):
+        return {}
+
+    return {row['id']: row['name'] for row in _fetch_all('SELECT id, name FROM AccountNames', ())}
+
+
+def get_campaign_maps_by_author(account_id: str) -> list[CampaignMap]:
+    return _fetch_all('SELECT * FROM CampaignMaps WHERE author = ? ORDER BY timestampUnix', (account_id,))
+
+
+def get_last_changed(dataset: str) -> int | None:
+    '''
+    - Unix timestamp of when `dataset` (a table name, i.e. `'Zones'`) last had different content
+    - `None` if it has never been written with change detection
+    '''
+
+    if not _table_exists('Fingerprints'):
+        return None
+
+    row: dict | None = _fetch_one('SELECT changed FROM Fingerprints WHERE dataset = ?', (dataset,))
+    return row['changed'] if row is not None else None
+
+
+def get_maps_by_campaign(campaign: int) -> list[CampaignMap]:
+    return _fetch_all('SELECT * FROM CampaignMaps WHERE campaign = ? ORDER BY mapIndex', (campaign,))
+
+
+def get_stats(period_type: str, period: str | None = None) -> list[dict]:
+    '''
+    - precomputed summaries (count, mean, min, max, p10/p25/p50/p75/p90) from stats.py, one per period and metric
+    - `period_type` is one of `stats.sources`, `period` narrows it to one period (i.e. `'2026-10'` for a month)
+    '''
+
+    if not _table_exists('Stats'):
+        return []
+
+    if period is None:
+        return _fetch_all('SELECT * FROM Stats WHERE periodType = ? ORDER BY period, metric', (period_type,))
+
+    return _fetch_all('SELECT * FROM Stats WHERE periodType = ? AND period = ? ORDER BY metric', (period_type, period))
+
+
+def get_totd_by_date(date: str) -> TotdMap | None:
+    '''
+    - `date` is formatted `YYYY-MM-DD`
+    '''
+
+    if not _table_exists('TotdMaps'):
+        return None
+
+    return _fetch_one('SELECT * FROM TotdMaps WHERE date = ?', (date,))
+
+
+def get_totd_by_uid(uid: str) -> TotdMap | None:
+    return _fetch_one('SELECT * FROM TotdMaps WHERE uid = ?', (uid,))
+
+
+def get_totd_uids() -> set[str]:
+    if not _table_exists('TotdMaps'):
+        return set()
+
+    return {row['uid'] for row in _fetch_all('SELECT uid FROM TotdMaps', ())}
+
+
+def get_totd_maps_by_author(account_id: str) -> list[TotdMap]:
+    return _fetch_all('SELECT * FROM TotdMaps WHERE author = ? ORDER BY date', (account_id,))
+
+
+def get_totd_maps_by_season(season: str) -> list[TotdMap]:
+    return _fetch_all('SELECT * FROM TotdMaps WHERE season = ? ORDER BY date', (season,))
+
+
+def get_zone_children(zone_id: str) -> list[Zone]:
+    return _fetch_all('SELECT * FROM Zones WHERE parent = ? ORDER BY name', (zone_id,))
@@ -0,0 +1,65 @@
+# c 2026-10-19
+# m 2026-10-19
+
+from difflib import get_close_matches
+import re
+import sqlite3 as sql
+
+try:
+    from . import db
+except ImportError:
+    import db
+
+
+name_weight:   float = 10.0  # bm25 weight of a map name match relative to an author name match
+typo_cutoff:   float = 0.75  # minimum similarity for a misspelled term to match an indexed one
+typo_variants: int   = 3
+
+
+def _match(con: sql.Connection, expression: str, limit: int, source: str | None) -> list[str]:
+    query: str = f'''
+        SELECT uid
+        FROM MapSearch
+        WHERE MapSearch MATCH ? {'AND source = ?' if source else ''}
+        ORDER BY bm25(MapSearch, {name_weight}, 1.0)
+        LIMIT ?
+    '''
+
+    return [row[0] for row in con.execute(query, (expression, source, limit) if source else (expression, limit))]
+
+
+def _terms(text: str) -> list[str]:
+    return re.findall(r'\w+', text.lower())
+
+
+def search_maps(text: str, limit: int = 20, source: str | None = None) -> list[str]:
+    '''
+    - searches TOTD and campaign map names (and author names where known), best match first
+    - every term is matched as a prefix, i.e. `'win fa'` finds `'Winter Fall'`
+    - if nothing matches, each term is swapped for the closest indexed words to tolerate typos
+    - `source` limits results to one table: `'TotdMaps'` or `'CampaignMaps'`
+    - returns map UIDs
+    '''
+
+    if not (terms := _terms(text)):
+        return []
+
+    with sql.connect(db.db_file) as con:
+        if not con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'MapSearch'").fetchone():
+            return []
+
+        if (uids := _match(con, ' '.join(f'"{term}"*' for term in terms), limit, source)):
+            return uids
+
+        vocabulary: list[str] = [row[0] for row in con.execute('SELECT term FROM MapSearchVocab')]
+        groups:     list[str] = []
+
+        for term in terms:
+            candidates: list[str] = [word for word in vocabulary if abs(len(word) - len(term)) <= 2]
+
+            if not (close := get_close_matches(term, candidates, typo_variants, typo_cutoff)):
+                return []
+
+            groups.append(f'({' OR '.join(f'"{word}"*' for word in close)})')
+
+        return _match(con, ' AND '.join(groups), limit, source)
@@ -0,0 +1,143 @@
+# c 2026-10-19
+# m 2026-10-19
+
+from math import ceil
+import json
+import sqlite3 as sql
+from statistics import fmean
+from time import time
+
+
+medal_metrics: dict[str, str] = {
+    'authorTime': 'm.authorTime',
+    'bronzeTime': 'm.bronzeTime',
+    'goldTime':   'm.goldTime',
+    'silverTime': 'm.silverTime',
+}
+
+warrior_metrics: dict[str, str] = {
+    'atWarriorGap': 'w.authorTime - w.warriorTime',
+    'atWrGap':      'w.authorTime - w.worldRecord',
+    'warriorWrGap': 'w.warriorTime - w.worldRecord',
+}
+
+# period type -> (tables, period expression, one period's filter on an indexed column, UID expression, metrics)
+# filters take `:period`, or `:first`/`:last` days for months, so a date range is used instead of a scan
+sources: dict[str, tuple[str, str, str, str, dict[str, str]]] = {
+    'campaign':        ('CampaignMaps AS m',                                        'm.campaign',           'm.campaign = :period',             'm.uid', medal_metrics),
+    'month':           ('TotdMaps AS m',                                            'substr(m.date, 1, 7)', 'm.date BETWEEN :first AND :last',  'm.uid', medal_metrics),
+    'season':          ('TotdMaps AS m',                                            'm.season',             'm.season = :period',               'm.uid', medal_metrics),
+    'warriorCampaign': ('CampaignMaps AS m JOIN CampaignWarriors AS w USING (uid)', 'm.campaign',           'm.campaign = :period',             'w.uid', warrior_metrics),
+    'warriorMonth':    ('TotdWarriors AS w',                                        'substr(w.date, 1, 7)', 'w.date BETWEEN :first AND :last',  'w.uid', warrior_metrics),
+    'warriorOther':    ('OtherWarriors AS w',                                       'w.campaign',           'w.campaign = :period',             'w.uid', warrior_metrics),
+}
+
+
+def _create_table(cur: sql.Cursor) -> None:
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS Stats (
+            count      INT,
+            max        INT,
+            mean       REAL,
+            metric     TEXT,
+            min        INT,
+            p10        INT,
+            p25        INT,
+            p50        INT,
+            p75        INT,
+            p90        INT,
+            period     TEXT,
+            periodType TEXT,
+            updated    INT,
+            PRIMARY KEY (periodType, period, metric)
+        )
+    ''')
+
+
+def _percentile(ordered: list[int], percent: int) -> int:
+    # nearest-rank, so every value is one which actually occurred
+    return ordered[max(ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def _summarize(values: list[int]) -> dict:
+    ordered: list[int] = sorted(values)
+
+    return {
+        'count': len(ordered),
+        'max':   ordered[-1],
+        'mean':  round(fmean(ordered), 3),
+        'min':   ordered[0],
+        'p10':   _percentile(ordered, 10),
+        'p25':   _percentile(ordered, 25),
+        'p50':   _percentile(ordered, 50),
+        'p75':   _percentile(ordered, 75),
+        'p90':   _percentile(ordered, 90),
+    }
+
+
+def refresh(cur: sql.Cursor, period_type: str, uids: list[str] | None = None) -> int:
+    '''
+    - recomputes the `Stats` rows (count, mean, min/max, percentiles) of each metric for `period_type`
+        - `uids` given: only the periods those maps belong to
+        - `uids` is `None`, or `period_type` has never been summarized: every period
+    - only the touched periods' rows are read, each through an index, so the cost doesn't grow with the history
+    - returns the number of periods refreshed
+    '''
+
+    tables, period_sql, filter_sql, uid_sql, metrics = sources[period_type]
+
+    _create_table(cur)
+
+    if uids is not None and not cur.execute('SELECT 1 FROM Stats WHERE periodType = ? LIMIT 1', (period_type,)).fetchone():
+        uids = None  # backfill
+
+    try:
+        if uids is None:
+            periods: list = [row[0] for row in cur.execute(f'SELECT DISTINCT {period_sql} FROM {tables}')]
+        else:
+            periods = [
+                row[0] for row in cur.execute(
+                    f'SELECT DISTINCT {period_sql} FROM {tables} WHERE {uid_sql} IN (SELECT value FROM json_each(?))',
+                    (json.dumps(uids),)
+                )
+            ]
+    except sql.OperationalError as e:
+        if 'no such table' in str(e):  # nothing written yet
+            return 0
+        raise
+
+    if uids is None:
+        cur.execute('DELETE FROM Stats WHERE periodType = ?', (period_type,))
+
+    if not periods:
+        return 0
+
+    values: dict = {}
+
+    for period in periods:
+        for row in cur.execute(
+            f'SELECT {', '.join(metrics.values())} FROM {tables} WHERE {filter_sql}',
+            {'first': f'{period}-01', 'last': f'{period}-31', 'period': period}
+        ).fetchall():
+            for metric, value in zip(metrics, row):
+                if value is not None:
+                    values.setdefault((period, metric), []).append(value)
+
+    stamp: int = int(time())
+
+    cur.executemany(
+        'DELETE FROM Stats WHERE periodType = ? AND period = ?',
+        [(period_type, str(period)) for period in periods]
+    )
+    cur.executemany(
+        '''
+            INSERT INTO Stats (count, max, mean, metric, min, p10, p25, p50, p75, p90, period, periodType, updated)
+            VALUES (:count, :max, :mean, :metric, :min, :p10, :p25, :p50, :p75, :p90, :period, :periodType, :updated)
+        ''',
+        [
+            {**_summarize(metric_values), 'metric': metric, 'period': str(period), 'periodType': period_type, 'updated': stamp}
+            for (period, metric), metric_values in values.items()
+        ]
+    )
+
+    return len(periods)
@@ -1,11 +1,10 @@
 # c 2024-03-26
-# m 2024-07-21
+# m 2026-10-19
 
 from datetime import datetime as dt
 import os
 import re
-
-from pytz import timezone as tz
+from zoneinfo import ZoneInfo as tz
 
 
 log_file: str = f'{os.path.dirname(__file__)}/../tm.log'
@@ -19,6 +18,24 @@ def format_race_time(input_ms: int) -> str:
     return f'{min}:{str(sec).zfill(2)}.{str(ms).zfill(3)}'
 
 
+def get_warrior_time(author_time: int, world_record: int, factor: float | None = 0.25) -> int:
+    '''
+    - `factor` is offset from AT
+        - between `0.0` and `1.0`
+        - examples, given AT is `10.000` and WR is `8.000`:
+            - `0.000` - AT (`10.000`)
+            - `0.125` - 1/8 of the way between AT and WR (`9.750`) (default for TOTDs)
+            - `0.250` - 1/4 of the way between AT and WR (`9.500`) (default, default for campaigns)
+            - `0.750` - 3/4 of the way between AT and WR (`8.500`)
+            - `1.000` - WR (`8.000`)
+    '''
+
+    return author_time - max(
+        int((author_time - world_record) * (factor if factor is not None else 0.25)),
+        1
+    )
+
+
 def log(msg: str, print_term: bool = True) -> None:
     text: str = f'{now()} {msg}'
 